@@ -0,0 +1,62 @@
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.usuario import CurrentUser
+from app.services.usuario_service import get_token_version
+from app.db.database import get_db, engine, AsyncSessionLocal, AsyncReadSessionLocal
+from app.core.database import reads_from_primary
+from app.core.auth import decode_token
+from app.core.rate_limit import password_account_limit, password_ip_limit
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CurrentUser:
+    """Verifica o token e retorna o usuário atual, montado a partir das claims"""
+    claims = decode_token(token)
+    if not claims:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+
+    usuario_id = int(claims["sub"])
+    # Só a versão do token é conferida: do cache compartilhado ou uma busca pela chave primária
+    version = await get_token_version(db, usuario_id)
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    if claims["ver"] != version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    current_user = CurrentUser(id=usuario_id, email=claims["email"])
+
+    # Permite marcar o usuário como escritor recente quando esta sessão fizer commit de escritas
+    db.info["usuario_id"] = current_user.id
+    return current_user
+
+async def get_user_read_db(current_user: CurrentUser = Depends(get_current_user)):
+    """Sessão de leitura: réplica, ou o principal logo após uma escrita do próprio usuário"""
+    session_factory = AsyncSessionLocal if reads_from_primary(current_user.id) else AsyncReadSessionLocal
+    async with session_factory() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+def session_factory_of(db: AsyncSession):
+    """Fábrica de sessões do mesmo banco (principal ou réplica) da sessão da requisição.
+
+    Para corpos lidos depois da resposta começar (streaming): o ETag calculado no principal
+    logo após uma escrita não pode acompanhar um corpo lido da réplica atrasada.
+    """
+    return AsyncSessionLocal if db.bind is engine else AsyncReadSessionLocal
+
+def _client_ip(request: Request) -> str:
+    # Atrás de proxy, request.client só é o IP real com --proxy-headers e --forwarded-allow-ips
+    # incluindo o proxy (ver Procfile/start.sh); sem isso todos dividem o mesmo bucket
+    return request.client.host if request.client else "unknown"
+
+async def limit_login_attempts(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
+    """Limita tentativas de login por IP e por conta, antes de qualquer bcrypt"""
+    await password_ip_limit.check(_client_ip(request))
+    await password_account_limit.check(form_data.username.strip().lower())
+
+async def limit_password_checks(request: Request, current_user: CurrentUser = Depends(get_current_user)):
+    """Mesmo limite do login para as rotas que conferem a senha do usuário logado"""
+    await password_ip_limit.check(_client_ip(request))
+    await password_account_limit.check(current_user.email.lower())
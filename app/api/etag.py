@@ -0,0 +1,28 @@
+import hashlib
+from fastapi import Request, Response, status
+
+def list_etag(request: Request, usuario_id: int, data_version: int) -> str:
+    """ETag fraco da listagem: versão dos dados do usuário + caminho e parâmetros da requisição"""
+    # Mesma versão com outro limit/after/stream é outra representação
+    chave = f"{usuario_id}:{request.url.path}?{request.url.query}".encode()
+    return f'W/"{data_version}-{hashlib.blake2s(chave, digest_size=8).hexdigest()}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Comparação fraca com o If-None-Match (lista separada por vírgulas ou *)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaco = etag.removeprefix("W/")
+    return any(candidato.strip().removeprefix("W/") == opaco for candidato in header.split(","))
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    # O cliente pode guardar, mas revalida sempre (a resposta é do usuário autenticado)
+    response.headers["Cache-Control"] = "private, no-cache"
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_etag(response, etag)
+    return response
@@ -0,0 +1,20 @@
+from typing import Optional
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+
+def sparse_fields(schema: type[BaseModel]):
+    """Dependência do parâmetro fields=a,b,c: campos pedidos na ordem do schema, ou None para todos"""
+    allowed = tuple(schema.model_fields)
+
+    def dependency(fields: Optional[str] = Query(None, description=f"Campos separados por vírgula ({', '.join(allowed)}); id sempre vem")) -> tuple[str, ...] | None:
+        if not fields:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = requested.difference(allowed)
+        if unknown:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+        # id sempre vem junto: é o cursor da paginação
+        requested.add("id")
+        return tuple(name for name in allowed if name in requested)
+
+    return dependency
@@ -1,36 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from app.schemas.usuario import CurrentUser
 from app.schemas.instituicao import InstituicaoCreate, InstituicaoRead, InstituicaoUpdate
-from app.services.instituicao_service import create_instituicao, get_instituicao, get_instituicoes_by_usuario, update_instituicao, delete_instituicao
-from app.services.usuario_service import get_usuario_by_email
+from app.services.instituicao_service import create_instituicao, get_instituicao, get_instituicao_fields, get_instituicoes_page, stream_instituicoes_by_usuario, update_instituicao, delete_instituicao
+from app.services.usuario_service import get_data_version
 from app.db.database import get_db
-from app.core.auth import decode_token
-from app.models.usuario import Usuario
+from app.api.dependencies import get_current_user, get_user_read_db, session_factory_of
+from app.api.pagination import set_next_cursor
+from app.api.etag import list_etag, etag_matches, set_etag, not_modified
+from app.api.streaming import ndjson_response
+from app.api.serialization import dump_trusted, json_response
+from app.api.fields import sparse_fields
 from app.models.instituicao import Instituicao
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
-
 router = APIRouter(prefix="/instituition", tags=["Instituição"])
 
-async def get_current_user(token: str, db: AsyncSession) -> Usuario:
-    """Verifica o token e retorna o usuário atual"""
-    token_email = decode_token(token)
-    if not token_email:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    current_user = await get_usuario_by_email(db, token_email)
-    if not current_user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    
-    return current_user
+instituicao_fields = sparse_fields(InstituicaoRead)
 
 @router.post("/{user_id}", response_model=InstituicaoRead, status_code=status.HTTP_201_CREATED)
-async def create_instituition(user_id: int, instituicao: InstituicaoCreate, db: AsyncSession = Depends(get_db)):#, token: str = Depends(oauth2_scheme)):
+async def create_instituition(user_id: int, instituicao: InstituicaoCreate, db: AsyncSession = Depends(get_db)):#, current_user: CurrentUser = Depends(get_current_user)):
     try:
-        # current_user = await get_current_user(token, db)
-        
         # # Verificar se o usuário pode criar instituição para este user_id
         # if current_user.id != user_id:
         #     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to create this institution")
@@ -42,33 +33,51 @@ async def create_instituition(user_id: int, instituicao: InstituicaoCreate, db:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.get("/all/{user_id}", response_model=list[InstituicaoRead])
-async def get_instituitions_by_user(user_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_instituitions_by_user(user_id: int, request: Request, response: Response, limit: Optional[int] = Query(None, ge=1, le=1000), after: Optional[int] = None, stream: bool = False, fields: tuple[str, ...] | None = Depends(instituicao_fields), db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-        
         # Verificar se o usuário pode ver as instituições deste user_id
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to view this institutions")
 
-        return await get_instituicoes_by_usuario(db=db, usuario_id=user_id)
+        # Versão lida antes das linhas: uma escrita no meio deixa o ETag antigo, nunca o contrário
+        data_version = await get_data_version(db, current_user.id) or 0
+        etag = list_etag(request, current_user.id, data_version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        if stream:
+            streaming = ndjson_response(lambda session: stream_instituicoes_by_usuario(session, user_id, after=after, fields=fields), InstituicaoRead, session_factory_of(db))
+            set_etag(streaming, etag)
+            return streaming
+
+        instituicoes = await get_instituicoes_page(db, user_id, data_version, limit=limit, after=after, fields=fields)
+        set_next_cursor(response, instituicoes, limit)
+        set_etag(response, etag)
+        return json_response(instituicoes, response)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.get("/{instituicao_id}", response_model=InstituicaoRead)
-async def get_instituition_by_id(instituicao_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_instituition_by_id(instituicao_id: int, fields: tuple[str, ...] | None = Depends(instituicao_fields), db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-
-        instituicao = await get_instituicao(db, instituicao_id)
+        if fields is None:
+            instituicao = await get_instituicao(db, instituicao_id)
+            owner_id = instituicao.usuario_id if instituicao else None
+        else:
+            instituicao = await get_instituicao_fields(db, instituicao_id, fields)
+            owner_id = instituicao.dono_id if instituicao else None
         if not instituicao:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
             
         # Verificar se o usuário é dono da instituição
-        if current_user.id != instituicao.usuario_id:
+        if current_user.id != owner_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to view this institution")
 
+        if fields is not None:
+            # Só os campos pedidos; o response_model exigiria todos
+            return json_response(dump_trusted(instituicao, InstituicaoRead))
         return instituicao
     except HTTPException as e:
         raise e
@@ -76,10 +85,8 @@ async def get_instituition_by_id(instituicao_id: int, db: AsyncSession = Depends
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.put("/{instituicao_id}", response_model=InstituicaoRead)
-async def update_instituition(instituicao_id: int, instituicao_data: InstituicaoUpdate, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def update_instituition(instituicao_id: int, instituicao_data: InstituicaoUpdate, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-
         # Verificar se a instituição existe e se o usuário é o dono
         instituicao = await get_instituicao(db, instituicao_id)
         if not instituicao:
@@ -98,10 +105,8 @@ async def update_instituition(instituicao_id: int, instituicao_data: Instituicao
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
 @router.delete("/{instituicao_id}")
-async def delete_instituition(instituicao_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def delete_instituition(instituicao_id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-
         # Verificar se a instituição existe e se o usuário é o dono
         instituicao = await get_instituicao(db, instituicao_id)
         if not instituicao:
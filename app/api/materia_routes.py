@@ -1,38 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+import codecs
+import csv
+from typing import Any, Iterable, Optional
+from fastapi import APIRouter, Body, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from app.schemas.materia import MateriaCreate, MateriaRead, MateriaUpdate
-from app.services.materia_service import create_materia, get_materia, get_materias_by_instituicao, update_materia, delete_materia
-from app.services.usuario_service import get_usuario_by_email
-from app.services.instituicao_service import get_instituicao
+from app.schemas.usuario import CurrentUser
+from app.schemas.falta_evento import FaltaDelta, FaltaEventoRead
+from app.schemas.materia import MateriaCreate, MateriaRead, MateriaUpdate, MateriaBulkResult, MateriaBulkResponse
+from app.services.materia_service import add_faltas, create_materia, create_materias_bulk, get_materia_with_owner, get_materias_page, stream_materias_by_instituicao, update_materia, delete_materia
+from app.services.instituicao_service import get_data_version_and_owner, get_instituicao
+from app.services.falta_evento_service import get_eventos_by_materia
 from app.db.database import get_db
-from app.core.auth import decode_token
+from app.api.dependencies import get_current_user, get_user_read_db, session_factory_of
+from app.api.pagination import set_next_cursor
+from app.api.etag import list_etag, etag_matches, set_etag, not_modified
+from app.api.streaming import ndjson_response
+from app.api.serialization import dump_trusted, json_response
+from app.api.fields import sparse_fields
 from app.models.instituicao import Instituicao
-from app.models.usuario import Usuario
 from app.models.materia import Materia
 
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
-
 router = APIRouter(prefix="/subject", tags=["Matéria"])
 
-async def get_current_user(token: str, db: AsyncSession) -> Usuario:
-    """Verifica o token e retorna o usuário atual"""
-    token_email = decode_token(token)
-    if not token_email:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    current_user = await get_usuario_by_email(db, token_email)
-    if not current_user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    
-    return current_user
+materia_fields = sparse_fields(MateriaRead)
+
+BULK_MAX_ROWS = 500
+
+async def _bulk_create(db: AsyncSession, current_user: CurrentUser, instituition_id: int, rows: Iterable[dict[str, Any]]) -> MateriaBulkResponse:
+    """Valida as linhas uma a uma e insere as válidas de uma vez"""
+    current_institution = await get_instituicao(db, instituition_id)
+    if not current_institution:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
+
+    # Verificar se o usuário é dono da instituição (uma vez para o lote inteiro)
+    if current_user.id != current_institution.usuario_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to create this subject")
+
+    results: list[MateriaBulkResult] = []
+    valid: list[tuple[MateriaBulkResult, MateriaCreate]] = []
+    for index, row in enumerate(rows):
+        if index >= BULK_MAX_ROWS:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"At most {BULK_MAX_ROWS} subjects per request")
+        result = MateriaBulkResult(index=index)
+        try:
+            valid.append((result, MateriaCreate.model_validate(row)))
+        except ValidationError as e:
+            result.errors = e.errors(include_url=False, include_context=False, include_input=False)
+        results.append(result)
+
+    created = await create_materias_bulk(db, [materia for _, materia in valid], instituition_id)
+    for (result, _), materia in zip(valid, created):
+        result.materia = MateriaRead.model_validate(materia)
+
+    return MateriaBulkResponse(created=len(created), failed=len(results) - len(created), results=results)
 
 @router.post("/{instituition_id}", response_model=MateriaRead, status_code=status.HTTP_201_CREATED)
-async def create_subject(instituition_id: int, materia: MateriaCreate, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def create_subject(instituition_id: int, materia: MateriaCreate, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-
         current_institution = await get_instituicao(db, instituition_id)
         if not current_institution:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
@@ -47,42 +72,79 @@ async def create_subject(instituition_id: int, materia: MateriaCreate, db: Async
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
-@router.get("/all/{instituition_id}", response_model=list[MateriaRead])
-async def get_subjects_by_instituition(instituition_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+@router.post("/bulk/{instituition_id}", response_model=MateriaBulkResponse)
+async def create_subjects_bulk(instituition_id: int, materias: list[dict[str, Any]] = Body(...), db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Cria várias matérias a partir de uma lista JSON, com resultado por linha"""
+    try:
+        return await _bulk_create(db, current_user, instituition_id, materias)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.post("/bulk/{instituition_id}/csv", response_model=MateriaBulkResponse)
+async def create_subjects_bulk_csv(instituition_id: int, file: UploadFile = File(...), db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Cria várias matérias a partir de um CSV com cabeçalho nos campos de MateriaCreate"""
     try:
-        current_user = await get_current_user(token, db)
+        # Lê o arquivo linha a linha, sem carregá-lo inteiro na memória
+        rows = csv.DictReader(codecs.iterdecode(file.file, "utf-8-sig"))
+        return await _bulk_create(db, current_user, instituition_id, rows)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-        current_institution = await get_instituicao(db, instituition_id)
-        if not current_institution:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
+@router.get("/all/{instituition_id}", response_model=list[MateriaRead])
+async def get_subjects_by_instituition(instituition_id: int, request: Request, response: Response, limit: Optional[int] = Query(None, ge=1, le=1000), after: Optional[int] = None, stream: bool = False, fields: tuple[str, ...] | None = Depends(materia_fields), db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
+    try:
+        # Versão lida antes das linhas: uma escrita no meio deixa o ETag antigo, nunca o contrário.
+        # Vem na mesma consulta que o dono da instituição (ou do cache, sem o dono)
+        data_version, owner_id = await get_data_version_and_owner(db, current_user.id, instituition_id)
+        if owner_id is None:
+            current_institution = await get_instituicao(db, instituition_id)
+            if not current_institution:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
+            owner_id = current_institution.usuario_id
 
         # Verificar se o usuário é dono da instituição
-        if current_user.id != current_institution.usuario_id:
+        if current_user.id != owner_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to view this subjects")
 
-        return await get_materias_by_instituicao(db, instituition_id)
+        # Só depois da checagem de dono: um ETag válido não responde por instituição alheia
+        etag = list_etag(request, current_user.id, data_version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        if stream:
+            streaming = ndjson_response(lambda session: stream_materias_by_instituicao(session, instituition_id, after=after, fields=fields), MateriaRead, session_factory_of(db))
+            set_etag(streaming, etag)
+            return streaming
+
+        materias = await get_materias_page(db, current_user.id, instituition_id, data_version, limit=limit, after=after, fields=fields)
+        set_next_cursor(response, materias, limit)
+        set_etag(response, etag)
+        return json_response(materias, response)
     except HTTPException as e:
         raise e
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.get("/{materia_id}", response_model=MateriaRead)
-async def get_subject_by_id(materia_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_subject_by_id(materia_id: int, fields: tuple[str, ...] | None = Depends(materia_fields), db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-
-        materia = await get_materia(db, materia_id)
-        if not materia:
+        # Matéria e dono da instituição em uma única consulta
+        materia_owner = await get_materia_with_owner(db, materia_id, fields)
+        if not materia_owner:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Matéria not found")
+        materia, owner_id = materia_owner
 
-        current_institution = await get_instituicao(db, materia.instituicao_id)
-        if not current_institution:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
-            
         # Verificar se o usuário é dono da instituição
-        if current_user.id != current_institution.usuario_id:
+        if current_user.id != owner_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to view this subject")
 
+        if fields is not None:
+            # Só os campos pedidos; o response_model exigiria todos
+            return json_response(dump_trusted(materia, MateriaRead))
         return materia
     except HTTPException as e:
         raise e
@@ -90,24 +152,28 @@ async def get_subject_by_id(materia_id: int, db: AsyncSession = Depends(get_db),
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.put("/{materia_id}", response_model=MateriaRead)
-async def update_subject(materia_id: int, materia_data: MateriaUpdate, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def update_subject(materia_id: int, materia_data: MateriaUpdate, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-
-        # Primeiro verificar se a matéria existe
-        materia = await get_materia(db, materia_id)
-        if not materia:
+        # Matéria e dono da instituição em uma única consulta
+        materia_owner = await get_materia_with_owner(db, materia_id)
+        if not materia_owner:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Matéria not found")
+        materia, owner_id = materia_owner
 
-        current_institution = await get_instituicao(db, materia.instituicao_id)
-        if not current_institution:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
-            
         # Verificar se o usuário é dono da instituição
-        if current_user.id != current_institution.usuario_id:
+        if current_user.id != owner_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to update this subject")
 
-        updated_materia = await update_materia(db, materia_id, materia_data)
+        # Mover para outra instituição: a de destino também precisa ser do usuário
+        destino_id = materia_data.instituicao_id
+        if destino_id is not None and destino_id != materia.instituicao_id:
+            destino = await get_instituicao(db, destino_id)
+            if not destino:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
+            if current_user.id != destino.usuario_id:
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to move this subject")
+
+        updated_materia = await update_materia(db, materia_id, materia_data, materia.faltas)
         if not updated_materia:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Matéria not found")
         return updated_materia
@@ -116,22 +182,52 @@ async def update_subject(materia_id: int, materia_data: MateriaUpdate, db: Async
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.delete("/{materia_id}")
-async def delete_subject(materia_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+@router.post("/{materia_id}/absences", response_model=MateriaRead)
+async def add_subject_absences(materia_id: int, delta: FaltaDelta, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Registra n faltas (ou desconta, com n negativo) de forma atômica"""
     try:
-        current_user = await get_current_user(token, db)
+        materia = await add_faltas(db, materia_id, current_user.id, delta.n)
+        if materia:
+            return materia
 
-        # CORREÇÃO DO BUG CRÍTICO: Buscar a matéria primeiro, não a instituição pelo materia_id
-        materia = await get_materia(db, materia_id)
-        if not materia:
+        # Nenhuma linha alterada: descobrir se a matéria não existe ou é de outro usuário
+        if not await get_materia_with_owner(db, materia_id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Matéria not found")
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to update this subject")
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.get("/{materia_id}/absences", response_model=list[FaltaEventoRead])
+async def get_subject_absence_history(materia_id: int, limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Histórico de alterações de faltas da matéria, mais recentes primeiro"""
+    try:
+        materia_owner = await get_materia_with_owner(db, materia_id)
+        if not materia_owner:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Matéria not found")
+        materia, owner_id = materia_owner
+
+        if current_user.id != owner_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to view this subject")
+
+        return await get_eventos_by_materia(db, materia_id, limit)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+@router.delete("/{materia_id}")
+async def delete_subject(materia_id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    try:
+        # Matéria e dono da instituição em uma única consulta
+        materia_owner = await get_materia_with_owner(db, materia_id)
+        if not materia_owner:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Matéria not found")
+        materia, owner_id = materia_owner
 
-        current_institution = await get_instituicao(db, materia.instituicao_id)
-        if not current_institution:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Instituição not found")
-            
         # Verificar se o usuário é dono da instituição
-        if current_user.id != current_institution.usuario_id:
+        if current_user.id != owner_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User not authorized to delete this subject")
         
         if await delete_materia(db, materia_id):
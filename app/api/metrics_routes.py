@@ -0,0 +1,45 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app.core.metrics import Gauge, render, pool_status
+from app.db.database import engine, read_engine
+
+router = APIRouter(tags=["Monitoramento"])
+
+# Acima desta ocupação do pool a instância deixa de receber tráfego novo
+READY_MAX_SATURATION = 1.0
+
+def _engines() -> dict:
+    engines = {"primary": engine}
+    if read_engine is not engine:
+        engines["replica"] = read_engine
+    return engines
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas no formato texto do Prometheus"""
+    # Ocupação do pool lida na hora da coleta, sem custo nas requisições
+    gauges = {
+        key: Gauge(f"db_pool_{key}", descricao, ("engine",))
+        for key, descricao in (
+            ("size", "Conexões base do pool"),
+            ("checked_out", "Conexões em uso"),
+            ("idle", "Conexões livres no pool"),
+            ("saturation", "Conexões em uso / capacidade máxima do pool"),
+        )
+    }
+    for name, eng in _engines().items():
+        status = pool_status(eng)
+        for key, gauge in gauges.items():
+            if key in status:
+                gauge.set(status[key], (name,))
+    return PlainTextResponse(render(list(gauges.values())), media_type="text/plain; version=0.0.4")
+
+@router.get("/ready")
+async def ready():
+    """Pronto para receber tráfego enquanto o pool do banco não estiver saturado"""
+    pools = {name: pool_status(eng) for name, eng in _engines().items()}
+    saturado = any(pool["saturation"] >= READY_MAX_SATURATION for pool in pools.values())
+    return JSONResponse(
+        {"status": "saturated" if saturado else "ready", "pools": pools},
+        status_code=503 if saturado else 200,
+    )
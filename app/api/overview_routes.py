@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.usuario import CurrentUser
+from app.schemas.overview import Overview, ProjecaoParams, MateriaProjecao
+from app.services.overview_service import get_overview
+from app.services.projection_service import get_projection
+from app.api.dependencies import get_current_user, get_user_read_db
+
+router = APIRouter(prefix="/overview", tags=["Resumo"])
+
+@router.get("", response_model=Overview)
+async def get_attendance_overview(risk_threshold: float = Query(0.75, gt=0, le=1), db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Faltas restantes, percentual usado e risco de cada matéria do usuário, com totais por instituição"""
+    try:
+        return await get_overview(db, current_user.id, risk_threshold)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+@router.post("/projection", response_model=list[MateriaProjecao])
+async def get_absence_projection(params: ProjecaoParams, db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Projeta aulas restantes e a data em que o limite de faltas estoura, para todas as matérias.
+
+    feriados são dias sem aula; faltar simula faltas nos dias informados.
+    """
+    try:
+        if params.fim < params.inicio:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="fim must not be before inicio")
+
+        return await get_projection(db, current_user.id, params.inicio, params.fim, params.feriados, params.faltar)
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
@@ -0,0 +1,7 @@
+from fastapi import Response
+
+def set_next_cursor(response: Response, items: list, limit: int | None):
+    """Página cheia: devolve o id do último item (objeto ou dicionário) como cursor da próxima página"""
+    if limit is not None and len(items) == limit:
+        ultimo = items[-1]
+        response.headers["X-Next-Cursor"] = str(ultimo["id"] if isinstance(ultimo, dict) else ultimo.id)
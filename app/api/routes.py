@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
+from app.api.dependencies import get_current_user, limit_login_attempts
 from fastapi.security import HTTPBearer, OAuth2PasswordRequestForm
-from app.schemas.usuario import UsuarioLogin
-from app.services.usuario_service import login_usuario
+from app.schemas.usuario import CurrentUser, UsuarioLogin
+from app.services.usuario_service import login_usuario, revoke_tokens
 
 security = HTTPBearer()
 router = APIRouter()
@@ -12,7 +13,7 @@ router = APIRouter()
 def secure_endpoint():
     return {"message": "Entrou"}
 
-@router.post("/token")
+@router.post("/token", dependencies=[Depends(limit_login_attempts)])
 async def login_usuario_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
     # OAuth2PasswordRequestForm usa 'username' como campo, mas tratamos como email
     usuario_input = UsuarioLogin(email=form_data.username, senha=form_data.password)
@@ -26,3 +27,15 @@ async def login_usuario_token(form_data: OAuth2PasswordRequestForm = Depends(),
         )
     else:
         return usuario
+
+@router.post("/logout")
+async def logout(db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Revoga todos os tokens do usuário (encerra todas as sessões)"""
+    try:
+        if not await revoke_tokens(db, current_user.id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        return {"detail": "Logged out"}
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
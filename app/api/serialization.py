@@ -0,0 +1,24 @@
+from typing import Any, Iterable
+from fastapi import Response
+from pydantic import BaseModel
+from app.core.serialization import dump_trusted, dumps
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def json_response(content: Any, response: Response | None = None) -> FastJSONResponse:
+    """Conteúdo já em tipos JSON (ex.: páginas em cache) com os cabeçalhos da Response injetada"""
+    fast = FastJSONResponse(content)
+    if response is not None:
+        # Ao devolver a própria Response, o FastAPI ignora os cabeçalhos da Response injetada
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                fast.headers.append(name, value)
+    return fast
+
+def trusted_response(items: Iterable[Any], schema: type[BaseModel], response: Response | None = None) -> FastJSONResponse:
+    """Lista de linhas do banco como JSON, sem a validação do response_model do FastAPI"""
+    return json_response([dump_trusted(item, schema) for item in items], response)
@@ -0,0 +1,60 @@
+from typing import AsyncIterator, Callable
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.db.database import AsyncReadSessionLocal
+from app.api.serialization import dump_trusted, dumps
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+async def _serialize(stream: Callable[[AsyncSession], AsyncIterator], schema: type[BaseModel], session_factory: sessionmaker):
+    # Sessão própria: a da requisição já foi fechada quando o corpo é enviado
+    async with session_factory() as db:
+        async for item in stream(db):
+            # Linhas vindas do banco: sem revalidação, direto para JSON
+            yield dumps(dump_trusted(item, schema))
+
+async def _buffered(pieces: AsyncIterator[bytes]):
+    """Agrupa pedaços pequenos em blocos de ~64 KiB antes de enviar"""
+    chunk = []
+    size = 0
+    async for piece in pieces:
+        chunk.append(piece)
+        size += len(piece)
+        if size >= STREAM_CHUNK_SIZE:
+            yield b"".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"".join(chunk)
+
+def ndjson_response(stream: Callable[[AsyncSession], AsyncIterator], schema: type[BaseModel], session_factory: sessionmaker = AsyncReadSessionLocal) -> StreamingResponse:
+    """Serializa as linhas como NDJSON à medida que saem do banco.
+
+    session_factory: banco de onde o corpo é lido; use o mesmo da sessão da requisição
+    (session_factory_of) quando o ETag ou a checagem de acesso vieram dela.
+    """
+
+    async def lines():
+        async for item in _serialize(stream, schema, session_factory):
+            yield item + b"\n"
+
+    return StreamingResponse(_buffered(lines()), media_type="application/x-ndjson")
+
+def json_object_response(head: bytes, key: str, stream: Callable[[AsyncSession], AsyncIterator], schema: type[BaseModel], session_factory: sessionmaker = AsyncReadSessionLocal) -> StreamingResponse:
+    """Envia {<campos de head>, "<key>": [...]} com a lista serializada aos poucos.
+
+    head é um objeto JSON já serializado (ex.: dumps(...)).
+    """
+
+    async def pieces():
+        prefix = head[:-1] + (b"," if head != b"{}" else b"") + f'"{key}":['.encode()
+        yield prefix
+        first = True
+        async for item in _serialize(stream, schema, session_factory):
+            yield item if first else b"," + item
+            first = False
+        yield b"]}"
+
+    return StreamingResponse(_buffered(pieces()), media_type="application/json")
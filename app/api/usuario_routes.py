@@ -1,43 +1,39 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from app.schemas.usuario import UsuarioCreate, UsuarioRead, UsuarioUpdate, UsuarioChangePassword
-from app.services.usuario_service import create_usuario, get_usuario, get_usuario_by_email, update_usuario, delete_usuario, change_password, get_all_users
-from app.db.database import get_db
-from app.core.auth import decode_token, verify_password
-from app.models.usuario import Usuario
-
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/token")
+from sqlalchemy.exc import IntegrityError
+from app.schemas.usuario import UsuarioCreate, UsuarioRead, UsuarioUpdate, UsuarioChangePassword, CurrentUser
+from app.services.usuario_service import create_usuario, get_usuario, update_usuario, delete_usuario, change_password, toggle_premium, get_all_users, stream_all_users
+from app.db.database import get_db, get_read_db
+from app.core.auth import verify_password_async
+from app.api.dependencies import get_current_user, get_user_read_db, limit_password_checks, session_factory_of
+from app.api.pagination import set_next_cursor
+from app.api.streaming import ndjson_response, json_object_response
+from app.api.serialization import dump_trusted, dumps, trusted_response
+from app.schemas.instituicao import InstituicaoExport
+from app.services.instituicao_service import stream_instituicoes_with_materias
+from app.services.email_index_service import email_in_use
 
 router = APIRouter(prefix="/user", tags=["Usuario"])
 
-async def get_current_user(token: str, db: AsyncSession) -> Usuario:
-    """Verifica o token e retorna o usuário atual"""
-    token_email = decode_token(token)
-    if not token_email:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-    
-    current_user = await get_usuario_by_email(db, token_email)
-    if not current_user:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    
-    return current_user
-
 @router.post("", response_model=UsuarioRead, status_code=status.HTTP_201_CREATED)
 async def create_user(user: UsuarioCreate, db: AsyncSession = Depends(get_db)):
     try:
+        # Antes do bcrypt: um email repetido não paga o hash
+        if await email_in_use(db, user.email):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already in use")
         return await create_usuario(db, user)
     except HTTPException as e:
         raise e
+    except IntegrityError:
+        # Cadastro concorrente com o mesmo email: a constraint unique decide
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already in use")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.get("/{user_id}", response_model=UsuarioRead)
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-        
         # Verificar se o usuário pode acessar este perfil
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
@@ -51,19 +47,42 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db), token: str
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
+@router.get("/{user_id}/export")
+async def export_user(user_id: int, format: Literal["json", "ndjson"] = "json", db: AsyncSession = Depends(get_user_read_db), current_user: CurrentUser = Depends(get_current_user)):
+    """Exporta o usuário com todas as instituições e matérias em uma única resposta.
+
+    format=json envia {"usuario": ..., "instituicoes": [...]}; format=ndjson envia
+    uma instituição (com as matérias) por linha. Com Accept-Encoding: gzip a resposta vai comprimida.
+    """
+    try:
+        if current_user.id != user_id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
+
+        def stream(session):
+            return stream_instituicoes_with_materias(session, user_id)
+
+        if format == "ndjson":
+            return ndjson_response(stream, InstituicaoExport, session_factory_of(db))
+
+        usuario = await get_usuario(db, user_id)
+        if not usuario:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        head = b'{"usuario":' + dumps(dump_trusted(usuario, UsuarioRead)) + b"}"
+        return json_object_response(head, "instituicoes", stream, InstituicaoExport, session_factory_of(db))
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
 @router.put("/{user_id}", response_model=UsuarioRead)
-async def update_user(user_id: int, user: UsuarioUpdate, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def update_user(user_id: int, user: UsuarioUpdate, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-        
         # Verificar se o usuário pode atualizar este perfil
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
         
-        if user.email:
-            existing_user_with_email = await db.scalar(select(Usuario).where(Usuario.email == user.email, Usuario.id != user_id))
-            if existing_user_with_email:
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already in use")
+        if user.email and await email_in_use(db, user.email, exclude_id=user_id):
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already in use")
 
         updated = await update_usuario(db, user_id, user)
         if not updated:
@@ -71,14 +90,14 @@ async def update_user(user_id: int, user: UsuarioUpdate, db: AsyncSession = Depe
         return updated
     except HTTPException as e:
         raise e
+    except IntegrityError:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Email already in use")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.delete("/{user_id}")
-async def delete_user(user_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+async def delete_user(user_id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-        
         # Verificar se o usuário pode deletar este perfil
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
@@ -92,11 +111,9 @@ async def delete_user(user_id: int, db: AsyncSession = Depends(get_db), token: s
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
-@router.put("/{user_id}/change-password")
-async def change_user_password(user_id: int, password_data: UsuarioChangePassword, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+@router.put("/{user_id}/change-password", dependencies=[Depends(limit_password_checks)])
+async def change_user_password(user_id: int, password_data: UsuarioChangePassword, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     try:
-        current_user = await get_current_user(token, db)
-        
         # Verificar se o usuário pode alterar a senha deste perfil
         if current_user.id != user_id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Access forbidden")
@@ -111,10 +128,15 @@ async def change_user_password(user_id: int, password_data: UsuarioChangePasswor
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
 @router.get("", response_model=list[UsuarioRead])
-async def list_all_users(db: AsyncSession = Depends(get_db)):
+async def list_all_users(response: Response, limit: int = Query(100, ge=1, le=1000), after: Optional[int] = None, stream: bool = False, db: AsyncSession = Depends(get_read_db)):
+    """Lista usuários por página (cursor em X-Next-Cursor) ou, com stream=true, tudo em NDJSON"""
     try:
-        users = await get_all_users(db)
-        return users
+        if stream:
+            return ndjson_response(lambda session: stream_all_users(session, after=after), UsuarioRead)
+
+        users = await get_all_users(db, limit=limit, after=after)
+        set_next_cursor(response, users, limit)
+        return trusted_response(users, UsuarioRead, response)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -126,27 +148,22 @@ async def check_email_availability(email_data: dict, db: AsyncSession = Depends(
         if not email:
             raise HTTPException(status_code=400, detail="Email is required")
             
-        user = await get_usuario_by_email(db, email)
-        return {"email_in_use": user is not None}
+        return {"email_in_use": await email_in_use(db, email)}
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.put("/{user_id}/premium")
-async def toggle_premium_status(user_id: int, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+@router.put("/{user_id}/premium", response_model=UsuarioRead)
+async def toggle_premium_status(user_id: int, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """Alterna status premium do usuário"""
     try:
-        current_user = await get_current_user(token, db)
-        
         if current_user.id != user_id:
             raise HTTPException(status_code=403, detail="Access forbidden")
         
-        user = await get_usuario(db, user_id)
+        user = await toggle_premium(db, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-            
-        user.is_premium = not user.is_premium
-        await db.commit()
-        await db.refresh(user)
         
         return user
     except HTTPException as e:
@@ -154,17 +171,23 @@ async def toggle_premium_status(user_id: int, db: AsyncSession = Depends(get_db)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/verify-password")
-async def verify_user_password(password_data: dict, db: AsyncSession = Depends(get_db), token: str = Depends(oauth2_scheme)):
+@router.post("/verify-password", dependencies=[Depends(limit_password_checks)])
+async def verify_user_password(password_data: dict, db: AsyncSession = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """Verifica se a senha está correta"""
     try:
-        current_user = await get_current_user(token, db)
         password = password_data.get("password")
         
         if not password:
             raise HTTPException(status_code=400, detail="Password is required")
+
+        # O usuário em cache não guarda o hash da senha
+        usuario = await get_usuario(db, current_user.id)
+        if not usuario:
+            raise HTTPException(status_code=404, detail="User not found")
+        # Devolve a conexão ao pool antes do bcrypt, que leva centenas de ms
+        await db.commit()
             
-        is_valid = verify_password(password, current_user.senha)
+        is_valid = await verify_password_async(password, usuario.senha)
         return {"is_valid": is_valid}
     except HTTPException as e:
         raise e
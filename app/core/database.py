@@ -1,40 +1,101 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+import logging
+from sqlalchemy.engine import make_url
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, declarative_base, sessionmaker
 from dotenv import load_dotenv
+from app.core.db_profiles import create_engine_for_profile
+from app.core.cache import TTLCache
+from app.core.metrics import METRICS_ENABLED, instrument_engine
 
 load_dotenv()
 
-# Base para os models
+# Base única para os models (app.db.database apenas re-exporta)
 Base = declarative_base()
 
+def _normalize_url(url: str) -> str:
+    if url.startswith("postgres://"):
+        # Render usa postgres://, mas SQLAlchemy precisa de postgresql+asyncpg://
+        return url.replace("postgres://", "postgresql+asyncpg://", 1)
+    if url.startswith("postgresql://"):
+        # Se já é postgresql://, troca para postgresql+asyncpg://
+        return url.replace("postgresql://", "postgresql+asyncpg://", 1)
+    return url
+
 # Detecta automaticamente se está no Render ou local
-DATABASE_URL = os.getenv("DATABASE_URL")
+# Se não tiver DATABASE_URL definida, usa SQLite local
+DATABASE_URL = _normalize_url(os.getenv("DATABASE_URL") or "sqlite+aiosqlite:///./skipddb.db")
 
-print(f"Original DATABASE_URL: {DATABASE_URL}")
+# Réplica opcional só para leitura; sem ela as leituras vão para o banco principal
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL:
+    DATABASE_READ_URL = _normalize_url(DATABASE_READ_URL)
 
-# Se não tiver DATABASE_URL definida, usa SQLite local
-if not DATABASE_URL:
-    DATABASE_URL = "sqlite+aiosqlite:///./skipddb.db"
-elif DATABASE_URL.startswith("postgres://"):
-    # Render usa postgres://, mas SQLAlchemy precisa de postgresql+asyncpg://
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql+asyncpg://", 1)
-elif DATABASE_URL.startswith("postgresql://"):
-    # Se já é postgresql://, troca para postgresql+asyncpg://
-    DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
-
-# Criar engine
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Após uma escrita, as leituras do mesmo usuário ficam no principal por este tempo
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Criar engine com o perfil de DB_PROFILE (dev, prod ou test)
+engine = create_engine_for_profile(DATABASE_URL)
+logging.getLogger(__name__).info("Banco de dados: %s", make_url(DATABASE_URL).render_as_string(hide_password=True))
+
+read_engine = engine
+if DATABASE_READ_URL:
+    read_engine = create_engine_for_profile(DATABASE_READ_URL)
+    logging.getLogger(__name__).info("Réplica de leitura: %s", make_url(DATABASE_READ_URL).render_as_string(hide_password=True))
+
+if METRICS_ENABLED:
+    instrument_engine(engine, "primary")
+    if read_engine is not engine:
+        instrument_engine(read_engine, "replica")
 
 # Session maker
 AsyncSessionLocal = sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+AsyncReadSessionLocal = sessionmaker(
+    read_engine, class_=AsyncSession, expire_on_commit=False
+)
+
+# Usuários que escreveram há pouco (usuario_id -> True)
+recent_writers = TTLCache(maxsize=10000, ttl=READ_YOUR_WRITES_SECONDS)
+
+@event.listens_for(Session, "do_orm_execute")
+def _track_statement_writes(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info["wrote"] = True
+
+@event.listens_for(Session, "after_flush")
+def _track_flush_writes(session, flush_context):
+    session.info["wrote"] = True
+
+@event.listens_for(Session, "after_commit")
+def _mark_recent_writer(session):
+    # usuario_id é anotado na sessão pelo get_current_user
+    if session.info.pop("wrote", False) and "usuario_id" in session.info:
+        recent_writers.set(session.info["usuario_id"], True)
+    # Donos dos dados alterados (touch_data_version), mesmo em rotas sem usuário autenticado
+    for usuario_id in session.info.pop("written_users", ()):
+        recent_writers.set(usuario_id, True)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_users(session):
+    session.info.pop("written_users", None)
+
+def reads_from_primary(usuario_id: int) -> bool:
+    return read_engine is engine or recent_writers.get(usuario_id, False)
+
 # Dependency para FastAPI
 async def get_db():
     async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+async def get_read_db():
+    async with AsyncReadSessionLocal() as session:
         try:
             yield session
         finally:
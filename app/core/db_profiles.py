@@ -0,0 +1,101 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from sqlalchemy.pool import NullPool
+from app.core.metrics import METRICS_ENABLED, TimedAsyncQueuePool
+
+# Perfis de runtime do banco, escolhidos por DB_PROFILE (dev, prod ou test)
+PROFILES = {
+    "dev": {
+        "echo": True,
+        "pool": {"pool_size": 5, "max_overflow": 10, "pool_pre_ping": False},
+        "asyncpg": {"prepared_statement_cache_size": 100},
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            # Necessário para o ON DELETE CASCADE (o SQLite vem com as FKs desligadas)
+            "foreign_keys": "ON",
+        },
+    },
+    "prod": {
+        "echo": False,
+        "pool": {"pool_size": 10, "max_overflow": 20, "pool_timeout": 10, "pool_recycle": 1800, "pool_pre_ping": True},
+        "asyncpg": {"prepared_statement_cache_size": 500},
+        "sqlite_pragmas": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "busy_timeout": 5000,
+            "foreign_keys": "ON",
+            "mmap_size": 268435456,
+            "cache_size": -64000,
+            "temp_store": "MEMORY",
+        },
+    },
+    "test": {
+        "echo": False,
+        # Sem pool: cada teste abre e fecha as próprias conexões
+        "pool": {"poolclass": NullPool},
+        "asyncpg": {"prepared_statement_cache_size": 0},
+        "sqlite_pragmas": {
+            "journal_mode": "MEMORY",
+            "synchronous": "OFF",
+            "busy_timeout": 5000,
+            "foreign_keys": "ON",
+        },
+    },
+}
+
+def get_profile(name: str | None = None) -> dict:
+    name = name or os.getenv("DB_PROFILE", "prod")
+    if name not in PROFILES:
+        raise ValueError(f"DB_PROFILE inválido: {name} (use {', '.join(PROFILES)})")
+    profile = {key: (value.copy() if isinstance(value, dict) else value) for key, value in PROFILES[name].items()}
+
+    # Ajustes finos por variável de ambiente, por cima do perfil
+    if os.getenv("DB_ECHO"):
+        profile["echo"] = os.getenv("DB_ECHO").lower() in ("1", "true", "yes")
+    if "poolclass" not in profile["pool"]:
+        for key, env in (("pool_size", "DB_POOL_SIZE"), ("max_overflow", "DB_MAX_OVERFLOW"), ("pool_recycle", "DB_POOL_RECYCLE")):
+            if os.getenv(env):
+                profile["pool"][key] = int(os.getenv(env))
+    if os.getenv("DB_STATEMENT_CACHE_SIZE"):
+        profile["asyncpg"]["prepared_statement_cache_size"] = int(os.getenv("DB_STATEMENT_CACHE_SIZE"))
+    return profile
+
+def _install_sqlite_pragmas(engine: AsyncEngine, pragmas: dict):
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def create_engine_for_profile(database_url: str, profile_name: str | None = None) -> AsyncEngine:
+    """Cria a engine assíncrona com pool, cache de statements e pragmas do perfil"""
+    profile = get_profile(profile_name)
+    url = make_url(database_url)
+    in_memory = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+    kwargs = {"echo": profile["echo"]}
+    if not in_memory:
+        # Banco em memória usa StaticPool (uma conexão só), que não aceita dimensionamento
+        kwargs.update(profile["pool"])
+        if METRICS_ENABLED and "poolclass" not in kwargs:
+            # Mesmo pool padrão, medindo a espera no checkout
+            kwargs["poolclass"] = TimedAsyncQueuePool
+
+    if url.get_backend_name() == "postgresql":
+        kwargs["connect_args"] = dict(profile["asyncpg"])
+        # Com cache desligado (ex.: atrás do pgbouncer) o asyncpg também não deve preparar statements
+        if profile["asyncpg"]["prepared_statement_cache_size"] == 0:
+            kwargs["connect_args"]["statement_cache_size"] = 0
+
+    engine = create_async_engine(url, **kwargs)
+    if url.get_backend_name() == "sqlite":
+        pragmas = profile["sqlite_pragmas"]
+        if in_memory:
+            # WAL não se aplica a banco em memória
+            pragmas = {name: value for name, value in pragmas.items() if name != "journal_mode"}
+        _install_sqlite_pragmas(engine, pragmas)
+    return engine
@@ -0,0 +1,53 @@
+import os
+from typing import Iterable, Sequence
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Modo de compatibilidade: emite também os campos antigos aulas_<dia> nas respostas
+# (a entrada aceita os dois formatos sempre)
+HORARIO_CAMPOS_LEGADOS = os.getenv("HORARIO_CAMPOS_LEGADOS", "true").lower() in ("1", "true", "yes")
+
+# Mesma ordem de date.weekday(): segunda = 0 ... domingo = 6
+DIAS_SEMANA = ("segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo")
+CAMPOS_LEGADOS = tuple(f"aulas_{dia}" for dia in DIAS_SEMANA)
+
+# Horário semanal compactado em um inteiro: 8 bits por dia, segunda nos bits mais baixos
+BITS_POR_DIA = 8
+MAX_AULAS_DIA = (1 << BITS_POR_DIA) - 1
+HORARIO_COMPLETO = (1 << (BITS_POR_DIA * len(DIAS_SEMANA))) - 1
+
+def empacotar(aulas: Sequence[int]) -> int:
+    """Aulas por dia (segunda a domingo) -> inteiro compactado"""
+    horario = 0
+    for dia, quantidade in enumerate(aulas):
+        horario |= quantidade << (BITS_POR_DIA * dia)
+    return horario
+
+def desempacotar(horario: int) -> list[int]:
+    """Inteiro compactado -> aulas por dia (segunda a domingo)"""
+    return [(horario >> (BITS_POR_DIA * dia)) & MAX_AULAS_DIA for dia in range(len(DIAS_SEMANA))]
+
+def aulas_no_dia(horario: int, dia: int) -> int:
+    return (horario >> (BITS_POR_DIA * dia)) & MAX_AULAS_DIA
+
+def ponderar(horario: int, dias: Iterable[int]) -> int:
+    """Soma de aulas × ocorrências de cada dia da semana, direto sobre o horário compactado"""
+    total = 0
+    for quantidade in dias:
+        total += (horario & MAX_AULAS_DIA) * quantidade
+        horario >>= BITS_POR_DIA
+    return total
+
+def mascara_dias(aulas: dict[int, int]) -> tuple[int, int]:
+    """(mantidos, novos) para trocar as aulas dos dias indicados ({dia: aulas}): (horario & mantidos) | novos.
+
+    Só inteiros positivos, para servir também como expressão SQL sobre a coluna.
+    """
+    mantidos = HORARIO_COMPLETO
+    novos = 0
+    for dia, quantidade in aulas.items():
+        deslocamento = BITS_POR_DIA * dia
+        mantidos &= ~(MAX_AULAS_DIA << deslocamento)
+        novos |= quantidade << deslocamento
+    return mantidos, novos
@@ -0,0 +1,207 @@
+import contextvars
+import os
+from bisect import bisect_left
+from time import perf_counter
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Liga o middleware, os eventos da engine e o pool com medição de espera
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pares = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """Contador monotônico no formato texto do Prometheus"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values = {}
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+class Gauge(Counter):
+    """Valor que sobe e desce (ex.: requisições em andamento)"""
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+    def set(self, value: float, labels: tuple = ()):
+        self._values[labels] = value
+
+class Histogram:
+    """Histograma com buckets fixos; guarda contagens por bucket e acumula só na exportação"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value: float, labels: tuple = ()):
+        serie = self._values.get(labels)
+        if serie is None:
+            # [contagem por bucket (+Inf no fim), soma]
+            serie = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        serie[0][bisect_left(self.buckets, value)] += 1
+        serie[1] += value
+
+    def samples(self):
+        for labels, (contagens, soma) in self._values.items():
+            acumulado = 0
+            for limite, contagem in zip(self.buckets + (float("inf"),), contagens):
+                acumulado += contagem
+                yield f"{self.name}_bucket", _format_labels(self.labelnames, labels, f'le="{_format_value(float(limite))}"'), acumulado
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), soma
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), acumulado
+
+http_requests_total = Counter("http_requests_total", "Requisições HTTP atendidas", ("method", "route", "status"))
+http_request_duration = Histogram("http_request_duration_seconds", "Latência das requisições HTTP", ("method", "route"))
+http_requests_in_flight = Gauge("http_requests_in_flight", "Requisições HTTP em andamento")
+http_request_db_duration = Histogram("http_request_db_seconds", "Tempo gasto no banco por requisição", ("method", "route"))
+http_request_db_statements = Histogram("http_request_db_statements", "Consultas ao banco por requisição", ("method", "route"), STATEMENT_BUCKETS)
+db_statements_total = Counter("db_statements_total", "Consultas executadas no banco", ("engine",))
+db_pool_checkout_wait = Histogram("db_pool_checkout_wait_seconds", "Espera para obter uma conexão do pool", ("engine",))
+cache_requests = Counter("cache_requests_total", "Consultas ao cache por resultado (local_hit, shared_hit, miss)", ("cache", "result"))
+cache_invalidations = Counter("cache_invalidations_received_total", "Invalidações recebidas de outros workers", ("cache",))
+rate_limit_rejections = Counter("rate_limit_rejections_total", "Requisições recusadas com 429 pelo limitador", ("limiter",))
+
+REGISTRY = [
+    http_requests_total,
+    http_request_duration,
+    http_requests_in_flight,
+    http_request_db_duration,
+    http_request_db_statements,
+    db_statements_total,
+    db_pool_checkout_wait,
+    cache_requests,
+    cache_invalidations,
+    rate_limit_rejections,
+]
+
+def render(extra: list | None = None) -> str:
+    """Exporta as métricas no formato texto do Prometheus (version 0.0.4)"""
+    linhas = []
+    for metric in REGISTRY + (extra or []):
+        linhas.append(f"# HELP {metric.name} {metric.documentation}")
+        linhas.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            linhas.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(linhas) + "\n"
+
+# Consultas e tempo de banco da requisição em andamento: [statements, segundos]
+_request_db = contextvars.ContextVar("request_db", default=None)
+
+class TimedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Pool padrão das engines assíncronas, medindo a espera no checkout"""
+
+    _metrics_engine = "primary"
+
+    def _do_get(self):
+        inicio = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_wait.observe(perf_counter() - inicio, (self._metrics_engine,))
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Conta consultas e tempo de banco da engine, atribuindo à requisição atual"""
+    sync_engine = engine.sync_engine
+    if isinstance(sync_engine.pool, TimedAsyncQueuePool):
+        sync_engine.pool._metrics_engine = name
+    labels = (name,)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        # Início guardado no próprio contexto de execução (um por statement)
+        context._metrics_start = perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        db_statements_total.inc(labels)
+        atual = _request_db.get()
+        if atual is not None:
+            atual[0] += 1
+            atual[1] += perf_counter() - context._metrics_start
+
+def pool_status(engine: AsyncEngine) -> dict:
+    """Ocupação do pool; pools sem limite (NullPool, StaticPool) nunca saturam"""
+    pool = engine.sync_engine.pool
+    if not hasattr(pool, "checkedout") or not hasattr(pool, "_max_overflow"):
+        return {"pool": type(pool).__name__, "saturation": 0.0}
+    em_uso = pool.checkedout()
+    # max_overflow -1 é overflow ilimitado
+    capacidade = pool.size() + pool._max_overflow if pool._max_overflow >= 0 else None
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": em_uso,
+        "idle": pool.checkedin(),
+        "saturation": round(em_uso / capacidade, 3) if capacidade else 0.0,
+    }
+
+class MetricsMiddleware:
+    """Middleware ASGI: latência e status por rota, requisições em andamento e tempo de banco"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        db = [0, 0.0]
+        token = _request_db.set(db)
+        http_requests_in_flight.inc()
+        inicio = perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duracao = perf_counter() - inicio
+            http_requests_in_flight.dec()
+            _request_db.reset(token)
+            # Rota como template (/api/subject/{materia_id}) para não explodir a cardinalidade
+            route = scope.get("route")
+            labels = (scope["method"], route.path if route is not None else "unmatched")
+            http_requests_total.inc(labels + (str(status),))
+            http_request_duration.observe(duracao, labels)
+            http_request_db_duration.observe(db[1], labels)
+            http_request_db_statements.observe(db[0], labels)
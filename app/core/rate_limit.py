@@ -0,0 +1,98 @@
+import os
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from fastapi import HTTPException, status
+from dotenv import load_dotenv
+from app.core.metrics import rate_limit_rejections
+
+load_dotenv()
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes")
+# Tentativas de senha (bcrypt): "quantidade/segundos", por IP e por conta
+PASSWORD_RATE_LIMIT_IP = os.getenv("PASSWORD_RATE_LIMIT_IP", "20/60")
+PASSWORD_RATE_LIMIT_ACCOUNT = os.getenv("PASSWORD_RATE_LIMIT_ACCOUNT", "5/60")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+class RateLimitStore(ABC):
+    """Armazenamento dos buckets; implemente hit() para compartilhar entre workers (ex.: Redis)"""
+
+    @abstractmethod
+    async def hit(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Consome uma ficha do bucket da chave; retorna 0 se permitido ou os segundos até a próxima ficha"""
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Token buckets no próprio processo: [fichas, último acesso, cheio em] por chave, em ordem de acesso"""
+
+    def __init__(self, maxsize: int = RATE_LIMIT_MAX_KEYS):
+        self.maxsize = maxsize
+        self._buckets: OrderedDict[str, list[float]] = OrderedDict()
+
+    def _evict_idle(self, now: float):
+        # Bucket que já encheu de novo equivale a uma chave nunca vista: pode sair
+        while self._buckets:
+            bucket = next(iter(self._buckets.values()))
+            if bucket[2] > now:
+                break
+            self._buckets.popitem(last=False)
+
+    async def hit(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.monotonic()
+        self._evict_idle(now)
+        bucket = self._buckets.get(key)
+        tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * refill_per_second)
+
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / refill_per_second
+        self._buckets[key] = [tokens, now, now + (capacity - tokens) / refill_per_second]
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+_store: RateLimitStore = MemoryRateLimitStore()
+
+def set_rate_limit_store(store: RateLimitStore):
+    """Troca o armazenamento de todos os limitadores (ex.: um compartilhado entre workers)"""
+    global _store
+    _store = store
+
+def get_rate_limit_store() -> RateLimitStore:
+    return _store
+
+def _parse_rate(rate: str) -> tuple[float, float]:
+    quantidade, segundos = rate.split("/")
+    return float(quantidade), float(segundos)
+
+class RateLimit:
+    """Token bucket: até `capacity` tentativas seguidas, repostas aos poucos ao longo de `period` segundos"""
+
+    def __init__(self, name: str, rate: str):
+        self.name = name
+        self.capacity, period = _parse_rate(rate)
+        self.refill_per_second = self.capacity / period
+
+    async def check(self, key: str):
+        """Levanta 429 (com Retry-After) quando a chave estourou o limite"""
+        if not RATE_LIMIT_ENABLED:
+            return
+        retry_after = await _store.hit(f"{self.name}:{key}", self.capacity, self.refill_per_second)
+        if retry_after:
+            rate_limit_rejections.inc((self.name,))
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, try again later",
+                headers={"Retry-After": str(max(1, round(retry_after)))},
+            )
+
+password_ip_limit = RateLimit("password_ip", PASSWORD_RATE_LIMIT_IP)
+password_account_limit = RateLimit("password_account", PASSWORD_RATE_LIMIT_ACCOUNT)
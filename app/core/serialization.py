@@ -0,0 +1,53 @@
+from functools import lru_cache
+from typing import Any, Callable, get_args, get_origin
+from pydantic import BaseModel, BeforeValidator
+from sqlalchemy.engine import Row
+
+try:
+    import orjson
+
+    def dumps(payload: Any) -> bytes:
+        return orjson.dumps(payload)
+except ImportError:
+    # Sem orjson, o serializador em Rust do pydantic-core (mais lento, mas sem dependência extra)
+    from pydantic_core import to_json as dumps
+
+@lru_cache(maxsize=None)
+def _plan(schema: type[BaseModel]) -> tuple[tuple[str, type[BaseModel] | None, bool, Callable | None], ...]:
+    """Campos do schema: (nome, schema aninhado ou None, é lista, conversão), calculado uma vez por schema"""
+    plano = []
+    for name, field in schema.model_fields.items():
+        annotation = field.annotation
+        is_list = get_origin(annotation) is list
+        if is_list:
+            annotation = get_args(annotation)[0]
+        nested = annotation if isinstance(annotation, type) and issubclass(annotation, BaseModel) else None
+        # BeforeValidator do campo converte o valor da coluna (ex.: horário compactado -> lista)
+        convert = next((item.func for item in field.metadata if isinstance(item, BeforeValidator)), None)
+        plano.append((name, nested, is_list, convert))
+    return tuple(plano)
+
+def dump_trusted(obj: Any, schema: type[BaseModel]) -> dict:
+    """Dicionário com os campos do schema, lido direto de uma linha do banco, sem revalidar.
+
+    Só para objetos vindos do banco (tipos já garantidos pelas colunas); campos fora do
+    schema (ex.: senha) nunca entram. Linhas de um select de colunas (fields=) trazem só os
+    campos do schema presentes na linha.
+    """
+    if isinstance(obj, Row):
+        values = obj._mapping
+        return {
+            name: convert(values[name]) if convert is not None else values[name]
+            for name, _, _, convert in _plan(schema) if name in values
+        }
+    # __dict__ evita o descriptor do ORM; atributos não carregados caem no getattr
+    values = obj.__dict__
+    data = {}
+    for name, nested, is_list, convert in _plan(schema):
+        value = values[name] if name in values else getattr(obj, name)
+        if nested is not None and value is not None:
+            value = [dump_trusted(item, nested) for item in value] if is_list else dump_trusted(value, nested)
+        elif convert is not None:
+            value = convert(value)
+        data[name] = value
+    return data
@@ -0,0 +1,353 @@
+import asyncio
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Hashable
+from pydantic_core import from_json, to_json
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+from app.core.cache import TTLCache
+from app.core.metrics import cache_invalidations, cache_requests
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Nível compartilhado entre workers: vazio (só o LRU local), redis://... ou sqlite:///arquivo
+CACHE_URL = os.getenv("CACHE_URL", "")
+CACHE_TTL = float(os.getenv("CACHE_TTL", "60"))
+CACHE_SIZE = int(os.getenv("CACHE_SIZE", "10000"))
+# Páginas de listagem ocupam mais memória: limite próprio de entradas
+CACHE_LIST_SIZE = int(os.getenv("CACHE_LIST_SIZE", "512"))
+CACHE_CHANNEL = os.getenv("CACHE_CHANNEL", "skipd:cache:invalidate")
+CACHE_POLL_INTERVAL = float(os.getenv("CACHE_POLL_INTERVAL", "0.5"))
+
+# Identifica as mensagens deste processo, que ele mesmo ignora ao recebê-las
+_WORKER_ID = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+class CacheBackend(ABC):
+    """Nível compartilhado: chave/valor com expiração e um canal de invalidação entre workers"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False): ...
+
+    @abstractmethod
+    async def delete(self, keys: list[str]): ...
+
+    @abstractmethod
+    async def delete_prefix(self, prefix: str): ...
+
+    @abstractmethod
+    async def publish(self, message: bytes): ...
+
+    @abstractmethod
+    def listen(self) -> AsyncIterator[bytes]:
+        """Mensagens publicadas (por qualquer worker) a partir de agora"""
+
+    async def close(self):
+        pass
+
+class RedisCacheBackend(CacheBackend):
+    """Redis ou compatível (Valkey, KeyDB...), com pub/sub para as invalidações; requer o pacote redis"""
+
+    def __init__(self, url: str, channel: str = CACHE_CHANNEL):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_URL aponta para um Redis, mas o pacote redis não está instalado") from e
+        self._redis = redis.from_url(url)
+        self.channel = channel
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False):
+        await self._redis.set(key, value, px=int(ttl * 1000), nx=only_if_absent)
+
+    async def delete(self, keys: list[str]):
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def delete_prefix(self, prefix: str):
+        # SCAN percorre o keyspace: só para exclusões, que são raras
+        pattern = re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+        keys = [key async for key in self._redis.scan_iter(match=pattern)]
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def publish(self, message: bytes):
+        await self._redis.publish(self.channel, message)
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self.channel)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
+    async def close(self):
+        await self._redis.aclose()
+
+class SQLiteCacheBackend(CacheBackend):
+    """Substituto do Redis num arquivo SQLite compartilhado (testes, vários workers na mesma máquina)"""
+
+    def __init__(self, path: str, poll_interval: float = CACHE_POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA busy_timeout=5000;
+            CREATE TABLE IF NOT EXISTS cache_entries (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS cache_messages (id INTEGER PRIMARY KEY AUTOINCREMENT, message BLOB NOT NULL, created_at REAL NOT NULL);
+        """)
+
+    async def _execute(self, sql: str, params: tuple = ()) -> list:
+        def run():
+            with self._lock:
+                return self._conn.execute(sql, params).fetchall()
+        return await asyncio.to_thread(run)
+
+    async def get(self, key: str) -> bytes | None:
+        rows = await self._execute("SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?", (key, time.time()))
+        return rows[0][0] if rows else None
+
+    async def set(self, key: str, value: bytes, ttl: float, only_if_absent: bool = False):
+        now = time.time()
+        # only_if_absent ainda sobrescreve uma entrada já expirada
+        condicao = "WHERE cache_entries.expires_at <= ?" if only_if_absent else ""
+        params = (key, value, now + ttl) + ((now,) if only_if_absent else ())
+        await self._execute(
+            "INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) "
+            f"ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at {condicao}",
+            params,
+        )
+
+    async def delete(self, keys: list[str]):
+        if keys:
+            await self._execute(f"DELETE FROM cache_entries WHERE key IN ({','.join('?' * len(keys))})", tuple(keys))
+
+    async def delete_prefix(self, prefix: str):
+        # Intervalo na chave primária em vez de LIKE (sem escapar % e _)
+        await self._execute("DELETE FROM cache_entries WHERE key >= ? AND key < ?", (prefix, prefix + "\uffff"))
+
+    async def publish(self, message: bytes):
+        now = time.time()
+        await self._execute("INSERT INTO cache_messages (message, created_at) VALUES (?, ?)", (message, now))
+        # Limpeza no caminho de escrita: mensagens antigas e entradas expiradas
+        await self._execute("DELETE FROM cache_messages WHERE created_at < ?", (now - 60,))
+        await self._execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,))
+
+    async def listen(self) -> AsyncIterator[bytes]:
+        ultimo = (await self._execute("SELECT coalesce(max(id), 0) FROM cache_messages"))[0][0]
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for id_, message in await self._execute("SELECT id, message FROM cache_messages WHERE id > ? ORDER BY id", (ultimo,)):
+                ultimo = id_
+                yield message
+
+    async def close(self):
+        self._conn.close()
+
+def create_backend(url: str) -> CacheBackend | None:
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisCacheBackend(url)
+    if url.startswith("sqlite:///"):
+        return SQLiteCacheBackend(url.removeprefix("sqlite:///"))
+    raise ValueError(f"CACHE_URL inválida: {url} (use redis://... ou sqlite:///arquivo)")
+
+_backend: CacheBackend | None = create_backend(CACHE_URL)
+_caches: dict[str, "Cache"] = {}
+_handlers: dict[str, Callable[[dict], None]] = {}
+_tasks: set[asyncio.Task] = set()
+_listener: asyncio.Task | None = None
+
+def _spawn(coro):
+    # Guarda a referência: o event loop só mantém referências fracas às tasks
+    task = asyncio.get_running_loop().create_task(coro)
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+async def _shared(operation: str, coro):
+    """Falha no nível compartilhado não derruba a requisição: segue só com o local"""
+    try:
+        return await coro
+    except Exception:
+        logger.warning("Cache compartilhado indisponível (%s)", operation, exc_info=True)
+        return None
+
+class Cache:
+    """Cache em dois níveis: LRU local do processo + nível compartilhado opcional (CACHE_URL).
+
+    Leituras vindas do banco entram com add, que não sobrescreve um valor já presente;
+    valores novos depois de uma escrita entram com set (ou set_after_commit), que também
+    avisa os outros workers para descartarem a cópia local. Sem CACHE_URL, cada worker
+    só enxerga as próprias escritas e o resto vence pelo TTL; com requires_shared, o cache
+    fica desligado nesse caso (toda leitura vai ao banco).
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float = CACHE_TTL, requires_shared: bool = False):
+        self.name = name
+        self.ttl = ttl
+        self.requires_shared = requires_shared
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        _caches[name] = self
+
+    @property
+    def enabled(self) -> bool:
+        return shared_enabled() or not self.requires_shared
+
+    def _key(self, key: Hashable) -> str:
+        return f"{self.name}:{key}"
+
+    async def get(self, key: Hashable) -> Any:
+        if not self.enabled:
+            return None
+        value = self.local.get(key)
+        if value is not None:
+            cache_requests.inc((self.name, "local_hit"))
+            return value
+        if _backend is not None:
+            raw = await _shared("get", _backend.get(self._key(key)))
+            if raw is not None:
+                value = from_json(raw)
+                self.local.set(key, value)
+                cache_requests.inc((self.name, "shared_hit"))
+                return value
+        cache_requests.inc((self.name, "miss"))
+        return None
+
+    async def add(self, key: Hashable, value: Any):
+        """Guarda um valor lido do banco sem sobrescrever um mais novo gravado por uma escrita"""
+        if not self.enabled:
+            return
+        if self.local.get(key) is None:
+            self.local.set(key, value)
+        if _backend is not None:
+            await _shared("add", _backend.set(self._key(key), to_json(value), self.ttl, only_if_absent=True))
+
+    async def set(self, key: Hashable, value: Any):
+        """Valor novo, já commitado no banco"""
+        if not self.enabled:
+            return
+        self.local.set(key, value)
+        if _backend is not None:
+            await _shared("set", _backend.set(self._key(key), to_json(value), self.ttl))
+            await _publish({"cache": self.name, "keys": [key]})
+
+    def set_after_commit(self, db, key: Hashable, value: Any):
+        """Agenda o set para depois do commit da sessão (descartado em rollback)"""
+        if not self.enabled:
+            return
+        db.info.setdefault("cache_pending", []).append((self, key, value))
+
+    async def invalidate(self, *keys: Hashable):
+        for key in keys:
+            self.local.delete(key)
+        if _backend is not None:
+            await _shared("delete", _backend.delete([self._key(key) for key in keys]))
+            await _publish({"cache": self.name, "keys": list(keys)})
+
+    async def invalidate_prefix(self, prefix: str):
+        self.local.delete_prefix(prefix)
+        if _backend is not None:
+            await _shared("delete_prefix", _backend.delete_prefix(self._key(prefix)))
+            await _publish({"cache": self.name, "prefix": prefix})
+
+async def _publish(message: dict):
+    await _shared("publish", _backend.publish(to_json({**message, "from": _WORKER_ID})))
+
+def shared_enabled() -> bool:
+    """Há nível compartilhado (as escritas de um worker chegam aos outros)"""
+    return _backend is not None
+
+def subscribe(topic: str, handler: Callable[[dict], None]):
+    """Recebe as mensagens de outros workers publicadas em topic"""
+    _handlers[topic] = handler
+
+async def publish(topic: str, **payload):
+    """Avisa os outros workers pelo canal de invalidação; sem nível compartilhado não faz nada"""
+    if _backend is not None:
+        await _publish({"topic": topic, **payload})
+
+async def _set_pending(pending: list):
+    for cache, key, value in pending:
+        await _shared("set", _backend.set(cache._key(key), to_json(value), cache.ttl))
+    for cache in {cache for cache, _, _ in pending}:
+        await _publish({"cache": cache.name, "keys": [key for c, key, _ in pending if c is cache]})
+
+@event.listens_for(Session, "after_commit")
+def _apply_pending(session):
+    pending = session.info.pop("cache_pending", None)
+    if pending:
+        # Local na hora (o próprio worker já lê o valor novo); compartilhado em segundo plano
+        for cache, key, value in pending:
+            cache.local.set(key, value)
+        if _backend is not None:
+            _spawn(_set_pending(pending))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("cache_pending", None)
+
+def _apply_message(raw: bytes):
+    message = from_json(raw)
+    if message.get("from") == _WORKER_ID:
+        return
+    if "topic" in message:
+        handler = _handlers.get(message["topic"])
+        if handler is not None:
+            handler(message)
+        return
+    cache = _caches.get(message.get("cache"))
+    if cache is None:
+        return
+    for key in message.get("keys", ()):
+        cache.local.delete(key)
+    if "prefix" in message:
+        cache.local.delete_prefix(message["prefix"])
+    cache_invalidations.inc((cache.name,))
+
+async def _listen():
+    while True:
+        try:
+            async for raw in _backend.listen():
+                _apply_message(raw)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Canal de invalidação do cache caiu; reconectando")
+            await asyncio.sleep(1)
+
+def configure_cache_backend(backend: CacheBackend | None):
+    """Troca o nível compartilhado (ex.: um SQLiteCacheBackend em testes); chamar antes de start_cache"""
+    global _backend
+    _backend = backend
+
+def start_cache():
+    """Assina o canal de invalidação do nível compartilhado, se houver"""
+    global _listener
+    if _backend is not None and _listener is None:
+        _listener = asyncio.get_running_loop().create_task(_listen())
+
+async def stop_cache():
+    global _listener
+    if _listener is not None:
+        _listener.cancel()
+        _listener = None
+    if _tasks:
+        await asyncio.gather(*_tasks, return_exceptions=True)
@@ -1,8 +1,4 @@
-from sqlalchemy.ext.declarative import declarative_base
-from app.core.database import get_db, engine, AsyncSessionLocal
-
-# Base para os models
-Base = declarative_base()
+from app.core.database import Base, get_db, get_read_db, engine, read_engine, AsyncSessionLocal, AsyncReadSessionLocal
 
 # Re-exporta as funções e objetos necessários
-__all__ = ["Base", "get_db", "engine", "AsyncSessionLocal"]
\ No newline at end of file
+__all__ = ["Base", "get_db", "get_read_db", "engine", "read_engine", "AsyncSessionLocal", "AsyncReadSessionLocal"]
\ No newline at end of file
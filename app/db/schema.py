@@ -0,0 +1,55 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+# Head das migrações em migrations/versions. Atualizar junto com cada nova migração
+# (o env.py do Alembic recusa rodar se estiver diferente)
+SCHEMA_REVISION = "0007"
+
+# Aplica as migrações no boot quando o banco estiver desatualizado (ex.: SQLite em disco efêmero)
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+
+def alembic_config(database_url: str | None = None):
+    # Import tardio: o Alembic só é carregado quando há migração a fazer
+    from alembic.config import Config
+
+    config = Config(str(ALEMBIC_INI))
+    config.attributes["configure_logger"] = False
+    if database_url:
+        config.set_main_option("sqlalchemy.url", database_url.replace("%", "%%"))
+    return config
+
+def upgrade_to_head(database_url: str | None = None):
+    from alembic import command
+
+    command.upgrade(alembic_config(database_url), "head")
+
+async def current_revision(engine: AsyncEngine) -> str | None:
+    """Revisão gravada no banco, em uma única consulta; None se nunca foi migrado"""
+    try:
+        async with engine.connect() as conn:
+            return (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar()
+    except DBAPIError:
+        # Tabela alembic_version inexistente
+        return None
+
+async def ensure_schema(engine: AsyncEngine):
+    """Confere a versão do esquema no startup; DDL só com MIGRATE_ON_STARTUP ou `alembic upgrade head`"""
+    atual = await current_revision(engine)
+    if atual == SCHEMA_REVISION:
+        return
+    if not MIGRATE_ON_STARTUP:
+        raise RuntimeError(
+            f"Esquema do banco na revisão {atual!r}, esperado {SCHEMA_REVISION!r}: rode `alembic upgrade head`"
+        )
+    logger.info("Migrando o banco da revisão %r para %r", atual, SCHEMA_REVISION)
+    # O env.py do Alembic roda o próprio event loop, então fica fora deste
+    await asyncio.to_thread(upgrade_to_head, engine.url.render_as_string(hide_password=False))
@@ -2,23 +2,34 @@ import os
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv
 from app.api.routes import router
 from app.api.instituicao_routes import router as instituicao_router
 from app.api.usuario_routes import router as usuario_router
 from app.api.materia_routes import router as materia_router
-from app.db.database import Base, engine
+from app.api.overview_routes import router as overview_router
+from app.api.metrics_routes import router as metrics_router
+from app.db.database import engine
+from app.db.schema import ensure_schema
+from app.core.auth import shutdown_password_hash_pool
+from app.core.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.core.shared_cache import start_cache, stop_cache
+from app.services.email_index_service import email_index
 
 # Carregar variáveis de ambiente do arquivo .env
 load_dotenv()
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Criar as tabelas no banco de dados durante o startup
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # Só confere a versão do esquema; as tabelas são criadas pelas migrações (alembic upgrade head)
+    await ensure_schema(engine)
+    start_cache()
+    email_index.start()
     yield
-    # Cleanup code can go here if needed
+    await email_index.stop()
+    await stop_cache()
+    shutdown_password_hash_pool()
 
 app = FastAPI(title="SkipD API", lifespan=lifespan)
 
@@ -28,10 +39,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Comprime respostas grandes (ex.: exportação) quando o cliente aceita gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Mais externo: mede a requisição inteira, incluindo a compressão
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(router, prefix="/api")
 app.include_router(instituicao_router, prefix="/api")
 app.include_router(usuario_router, prefix="/api")
 app.include_router(materia_router, prefix="/api")
+app.include_router(overview_router, prefix="/api")
+app.include_router(metrics_router)
 
@@ -0,0 +1,13 @@
+from datetime import datetime, timezone
+from app.db.database import Base
+from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+class FaltaEvento(Base):
+    """Registro append-only de cada alteração em Materia.faltas"""
+    __tablename__ = "faltas_eventos"
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    materia_id: Mapped[int] = mapped_column(ForeignKey("materias.id", ondelete="CASCADE"), nullable=False, index=True)
+    delta: Mapped[int] = mapped_column(nullable=False)
+    faltas: Mapped[int] = mapped_column(nullable=False)
+    criado_em: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
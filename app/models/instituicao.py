@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 from app.db.database import Base
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
@@ -9,11 +9,16 @@ if TYPE_CHECKING:
 
 class Instituicao(Base):
     __tablename__ = "instituicoes"
+    __table_args__ = (
+        # Listagem por usuário (ordenada por id) e o filtro de dono das consultas com join
+        Index("ix_instituicoes_usuario_id_id", "usuario_id", "id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     nome: Mapped[str] = mapped_column(nullable=False)
     limite_faltas: Mapped[float] = mapped_column(nullable=False, default=0.0)
-    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id"), nullable=False)
+    usuario_id: Mapped[int] = mapped_column(ForeignKey("usuarios.id", ondelete="CASCADE"), nullable=False)
     
     # Relacionamentos
     usuario: Mapped["Usuario"] = relationship("Usuario", back_populates="instituicoes")
-    materias: Mapped[list["Materia"]] = relationship("Materia", back_populates="instituicao", cascade="all, delete-orphan")
\ No newline at end of file
+    # O banco apaga as matérias (ON DELETE CASCADE); o ORM não as carrega para isso
+    materias: Mapped[list["Materia"]] = relationship("Materia", back_populates="instituicao", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
@@ -1,26 +1,51 @@
 from typing import TYPE_CHECKING
 from app.db.database import Base
-from sqlalchemy import ForeignKey
+from app.core.horario import BITS_POR_DIA, MAX_AULAS_DIA
+from sqlalchemy import BigInteger, ForeignKey, Index
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 if TYPE_CHECKING:
     from app.models.instituicao import Instituicao
 
+def _aulas_do_dia(dia: int):
+    """Campo antigo aulas_<dia>, lido do horário compactado (no objeto e em consultas)"""
+    deslocamento = BITS_POR_DIA * dia
+
+    @hybrid_property
+    def aulas(self) -> int:
+        return (self.horario >> deslocamento) & MAX_AULAS_DIA
+
+    @aulas.inplace.expression
+    @classmethod
+    def _aulas_expression(cls):
+        return cls.horario.bitwise_rshift(deslocamento).bitwise_and(MAX_AULAS_DIA)
+
+    return aulas
+
 class Materia(Base):
     __tablename__ = "materias"
+    __table_args__ = (
+        # Listagem por instituição (ordenada por id), join com instituicoes e delete em cascata
+        Index("ix_materias_instituicao_id_id", "instituicao_id", "id"),
+    )
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     nome: Mapped[str] = mapped_column(nullable=False)
     carga_horaria: Mapped[int] = mapped_column(nullable=False, default=0)
     faltas: Mapped[int] = mapped_column(nullable=False, default=0)
     status: Mapped[str] = mapped_column(nullable=False)
-    aulas_domingo: Mapped[int] = mapped_column(nullable=False, default=0)
-    aulas_segunda: Mapped[int] = mapped_column(nullable=False, default=0)
-    aulas_terca: Mapped[int] = mapped_column(nullable=False, default=0)
-    aulas_quarta: Mapped[int] = mapped_column(nullable=False, default=0)
-    aulas_quinta: Mapped[int] = mapped_column(nullable=False, default=0)
-    aulas_sexta: Mapped[int] = mapped_column(nullable=False, default=0)
-    aulas_sabado: Mapped[int] = mapped_column(nullable=False, default=0)
-    instituicao_id: Mapped[int] = mapped_column(ForeignKey("instituicoes.id"), nullable=False)
+    # Aulas por dia da semana compactadas (ver app.core.horario), no lugar das sete colunas aulas_<dia>
+    horario: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    instituicao_id: Mapped[int] = mapped_column(ForeignKey("instituicoes.id", ondelete="CASCADE"), nullable=False)
     
     # Relacionamento com Instituicao
-    instituicao: Mapped["Instituicao"] = relationship("Instituicao", back_populates="materias")
\ No newline at end of file
+    instituicao: Mapped["Instituicao"] = relationship("Instituicao", back_populates="materias")
+
+    # Campos antigos (modo de compatibilidade), calculados a partir de horario
+    aulas_segunda = _aulas_do_dia(0)
+    aulas_terca = _aulas_do_dia(1)
+    aulas_quarta = _aulas_do_dia(2)
+    aulas_quinta = _aulas_do_dia(3)
+    aulas_sexta = _aulas_do_dia(4)
+    aulas_sabado = _aulas_do_dia(5)
+    aulas_domingo = _aulas_do_dia(6)
\ No newline at end of file
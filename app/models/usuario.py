@@ -8,12 +8,20 @@ if TYPE_CHECKING:
 
 class Usuario(Base):
     __tablename__ = "usuarios"
+    # O token identifica o usuário pelo id: no SQLite, sem AUTOINCREMENT, o id de um usuário
+    # apagado voltaria no próximo cadastro (e o token antigo valeria para a conta nova)
+    __table_args__ = {"sqlite_autoincrement": True}
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True, index=True)
     nome: Mapped[str] = mapped_column(nullable=False)
     email: Mapped[str] = mapped_column(nullable=False, unique=True)
     senha: Mapped[str] = mapped_column(nullable=False)
     is_premium: Mapped[bool] = mapped_column(default=False)
     url_foto: Mapped[str] = mapped_column(default="")
+    # Incrementada a cada escrita em instituições/matérias do usuário (base do ETag das listagens)
+    data_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
+    # Incrementada para revogar todos os tokens já emitidos (troca de senha, logout)
+    token_version: Mapped[int] = mapped_column(nullable=False, default=0, server_default="0")
     
     # Relacionamento com Instituicao
-    instituicoes: Mapped[list["Instituicao"]] = relationship("Instituicao", back_populates="usuario", cascade="all, delete-orphan")
\ No newline at end of file
+    # O banco apaga instituições e matérias (ON DELETE CASCADE); o ORM não as carrega para isso
+    instituicoes: Mapped[list["Instituicao"]] = relationship("Instituicao", back_populates="usuario", cascade="all, delete-orphan", passive_deletes=True)
\ No newline at end of file
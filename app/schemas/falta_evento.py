@@ -0,0 +1,14 @@
+from pydantic import BaseModel, Field
+from datetime import datetime
+
+class FaltaDelta(BaseModel):
+    n: int = Field(1, ge=-100, le=100)
+
+class FaltaEventoRead(BaseModel):
+    id: int
+    materia_id: int
+    delta: int
+    faltas: int
+    criado_em: datetime
+    class Config:
+        from_attributes = True
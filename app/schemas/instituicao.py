@@ -1,5 +1,6 @@
 from pydantic import BaseModel
 from typing import Optional
+from app.schemas.materia import MateriaRead
 
 class Instituicao(BaseModel):
     nome: str
@@ -14,6 +15,9 @@ class InstituicaoRead(Instituicao):
     class Config:
         from_attributes = True
 
+class InstituicaoExport(InstituicaoRead):
+    materias: list[MateriaRead] = []
+
 class InstituicaoUpdate(BaseModel):
     nome: Optional[str] = None
     limite_faltas: Optional[float] = None
\ No newline at end of file
@@ -1,11 +1,45 @@
-from pydantic import BaseModel
-from typing import Optional
+from pydantic import BaseModel, BeforeValidator, Field, field_serializer, model_validator
+from typing import Annotated, Any, Optional
+from app.core.horario import CAMPOS_LEGADOS, HORARIO_CAMPOS_LEGADOS, MAX_AULAS_DIA, desempacotar, empacotar
+
+def _horario_lista(value: Any) -> Any:
+    # Aceita o inteiro compactado (coluna do banco) e "2,0,2,0,0,0,0" (ex.: CSV)
+    if isinstance(value, int):
+        return desempacotar(value)
+    if isinstance(value, str):
+        return [parte.strip() for parte in value.split(",")]
+    return value
+
+# Aulas por dia de segunda a domingo (ordem de date.weekday()), ex.: [2, 0, 2, 0, 0, 0, 0]
+Horario = Annotated[
+    list[Annotated[int, Field(ge=0, le=MAX_AULAS_DIA)]],
+    Field(min_length=7, max_length=7),
+    BeforeValidator(_horario_lista),
+]
 
 class Materia(BaseModel):
     nome: str
     carga_horaria: int
     faltas: int
     status: str
+    horario: Horario
+
+class MateriaCreate(Materia):
+    @model_validator(mode="before")
+    @classmethod
+    def _campos_legados(cls, data: Any) -> Any:
+        # Formato antigo (aulas_domingo ... aulas_sabado) vira horario; dias ausentes = 0
+        if isinstance(data, dict) and "horario" not in data and any(campo in data for campo in CAMPOS_LEGADOS):
+            data = {**data, "horario": [data.get(campo, 0) for campo in CAMPOS_LEGADOS]}
+        return data
+
+    @field_serializer("horario")
+    def _empacotar(self, horario: list[int]) -> int:
+        # model_dump vai direto para o INSERT: coluna compactada
+        return empacotar(horario)
+
+class MateriaHorarioLegado(Materia):
+    """Materia com os campos antigos do horário, emitidos no modo de compatibilidade (HORARIO_CAMPOS_LEGADOS)"""
     aulas_domingo: int
     aulas_segunda: int
     aulas_terca: int
@@ -14,10 +48,7 @@ class Materia(BaseModel):
     aulas_sexta: int
     aulas_sabado: int
 
-class MateriaCreate(Materia):
-    pass
-
-class MateriaRead(Materia):
+class MateriaRead(MateriaHorarioLegado if HORARIO_CAMPOS_LEGADOS else Materia):
     id: int
     instituicao_id: int
     class Config:
@@ -28,11 +59,27 @@ class MateriaUpdate(BaseModel):
     carga_horaria: Optional[int] = None
     faltas: Optional[int] = None
     status: Optional[str] = None
-    aulas_domingo: Optional[int] = None
-    aulas_segunda: Optional[int] = None
-    aulas_terca: Optional[int] = None
-    aulas_quarta: Optional[int] = None
-    aulas_quinta: Optional[int] = None
-    aulas_sexta: Optional[int] = None
-    aulas_sabado: Optional[int] = None
-    instituicao_id: Optional[int] = None
\ No newline at end of file
+    horario: Optional[Horario] = None
+    # Formato antigo: trocam só os dias enviados (ignorados se horario vier junto)
+    aulas_domingo: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    aulas_segunda: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    aulas_terca: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    aulas_quarta: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    aulas_quinta: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    aulas_sexta: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    aulas_sabado: Optional[int] = Field(None, ge=0, le=MAX_AULAS_DIA)
+    instituicao_id: Optional[int] = None
+
+    @field_serializer("horario")
+    def _empacotar(self, horario: Optional[list[int]]) -> Optional[int]:
+        return None if horario is None else empacotar(horario)
+
+class MateriaBulkResult(BaseModel):
+    index: int
+    materia: Optional[MateriaRead] = None
+    errors: Optional[list[dict[str, Any]]] = None
+
+class MateriaBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[MateriaBulkResult]
\ No newline at end of file
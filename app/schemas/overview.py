@@ -0,0 +1,43 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import date
+
+class MateriaOverview(BaseModel):
+    id: int
+    nome: str
+    faltas: int
+    faltas_permitidas: float
+    faltas_restantes: float
+    percentual_usado: Optional[float] = None
+    em_risco: bool
+
+class InstituicaoOverview(BaseModel):
+    id: int
+    nome: str
+    limite_faltas: float
+    total_materias: int
+    total_faltas: int
+    total_faltas_permitidas: float
+    materias_em_risco: int
+    materias: list[MateriaOverview]
+
+class Overview(BaseModel):
+    instituicoes: list[InstituicaoOverview]
+
+
+class ProjecaoParams(BaseModel):
+    inicio: date
+    fim: date
+    feriados: list[date] = []
+    faltar: list[date] = []
+
+class MateriaProjecao(BaseModel):
+    id: int
+    nome: str
+    instituicao_id: int
+    faltas: int
+    faltas_permitidas: float
+    aulas_restantes: int
+    faltas_projetadas: int
+    faltas_restantes: float
+    data_limite: Optional[date] = None
\ No newline at end of file
@@ -18,6 +18,13 @@ class UsuarioRead(BaseModel):
     class Config:
         from_attributes = True
 
+class CurrentUser(BaseModel):
+    id: int
+    email: str
+
+    class Config:
+        from_attributes = True
+
 class UsuarioUpdate(BaseModel):
     nome: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import time
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func
+from app.core.bloom import BloomFilter
+from app.core.shared_cache import publish, shared_enabled, subscribe
+from app.models.usuario import Usuario
+from app.db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+EMAIL_INDEX_CAPACITY = int(os.getenv("EMAIL_INDEX_CAPACITY", "100000"))
+EMAIL_INDEX_ERROR_RATE = float(os.getenv("EMAIL_INDEX_ERROR_RATE", "0.01"))
+EMAIL_INDEX_REFRESH_SECONDS = float(os.getenv("EMAIL_INDEX_REFRESH_SECONDS", "5"))
+# Mesma variável que o uvicorn lê para --workers
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+class EmailIndex:
+    """Índice em memória dos emails cadastrados: descarta sem consulta os emails certamente livres.
+
+    É só uma dica: "talvez em uso" é confirmado no banco, e a constraint unique continua valendo.
+    Emails removidos ou trocados ficam no filtro (falso positivo, confirmado no banco) até o
+    próximo restart.
+
+    Cadastros de outros workers entram pelo refresh (id > último lido); trocas de email, pelo
+    canal do cache compartilhado. Sem CACHE_URL e com mais de um worker, uma troca feita em
+    outro worker não chegaria aqui: nesse caso o índice não descarta nada e tudo vai ao banco.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, refresh_interval: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        # None até a carga inicial terminar; enquanto isso tudo vai ao banco
+        self._filter: BloomFilter | None = None
+        self._max_id = 0
+        self._refreshed_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    def add(self, email: str):
+        if self._filter is not None:
+            self._filter.add(normalize_email(email))
+
+    @property
+    def reliable(self) -> bool:
+        """O filtro vê as trocas de email de todos os workers"""
+        return self._filter is not None and (WEB_CONCURRENCY <= 1 or shared_enabled())
+
+    def might_contain(self, email: str) -> bool:
+        return not self.reliable or normalize_email(email) in self._filter
+
+    def _add_rows(self, rows):
+        for usuario_id, email in rows:
+            self._filter.add(normalize_email(email))
+            self._max_id = max(self._max_id, usuario_id)
+
+    async def refresh(self, db: AsyncSession):
+        """Acrescenta os usuários criados depois da última leitura (ex.: por outros workers)"""
+        result = await db.execute(
+            select(Usuario.id, Usuario.email).where(Usuario.id > self._max_id).order_by(Usuario.id)
+        )
+        self._add_rows(result.all())
+        self._refreshed_at = time.monotonic()
+
+    async def refresh_if_stale(self, db: AsyncSession):
+        if self._filter is not None and time.monotonic() - self._refreshed_at >= self.refresh_interval:
+            await self.refresh(db)
+
+    async def load(self):
+        async with AsyncSessionLocal() as db:
+            total = await db.scalar(select(func.count()).select_from(Usuario))
+            # Folga para crescer sem que a taxa de falso positivo dispare
+            filtro = BloomFilter(max(self.capacity, 2 * total), self.error_rate)
+            max_id = 0
+            result = await db.stream(select(Usuario.id, Usuario.email), execution_options={"yield_per": 5000})
+            async for rows in result.partitions():
+                for usuario_id, email in rows:
+                    filtro.add(normalize_email(email))
+                    max_id = max(max_id, usuario_id)
+            self._max_id = max_id
+            self._filter = filtro
+            # Cadastros feitos durante a carga
+            await self.refresh(db)
+        logger.info("Índice de emails carregado: %d emails", filtro.count)
+
+    async def _run(self):
+        try:
+            await self.load()
+        except Exception:
+            logger.exception("Falha ao carregar o índice de emails; verificações seguem pelo banco")
+
+    def start(self):
+        """Carrega o índice em segundo plano, sem atrasar o startup"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+email_index = EmailIndex(EMAIL_INDEX_CAPACITY, EMAIL_INDEX_ERROR_RATE, EMAIL_INDEX_REFRESH_SECONDS)
+subscribe("email", lambda message: email_index.add(message["email"]))
+
+async def email_changed(email: str):
+    """Email trocado por update: entra no índice deste worker e dos outros"""
+    email_index.add(email)
+    await publish("email", email=email)
+
+async def email_in_use(db: AsyncSession, email: str, exclude_id: int | None = None) -> bool:
+    """Email já cadastrado (opcionalmente ignorando o próprio usuário); só consulta o banco se o índice não descartar"""
+    if not email_index.might_contain(email):
+        await email_index.refresh_if_stale(db)
+        if not email_index.might_contain(email):
+            return False
+    query = select(Usuario.id).where(Usuario.email == email)
+    if exclude_id is not None:
+        query = query.where(Usuario.id != exclude_id)
+    return await db.scalar(query.limit(1)) is not None
@@ -0,0 +1,31 @@
+from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, insert, literal
+from app.models.falta_evento import FaltaEvento
+from app.models.materia import Materia
+
+def registrar_evento(materia_id: int, delta: int, faltas: int):
+    """INSERT do evento a partir da linha devolvida pelo UPDATE ... RETURNING (mesma transação)"""
+    return insert(FaltaEvento).values(materia_id=materia_id, delta=delta, faltas=faltas, criado_em=datetime.now(timezone.utc))
+
+def registrar_alteracao(delta, faltas, *where):
+    """INSERT ... SELECT do evento a partir da linha atual da matéria, para rodar antes do UPDATE.
+
+    Só quando o valor antigo não é conhecido: o UPDATE ... RETURNING devolve apenas o novo.
+
+    Fica na mesma transação da alteração: delta e faltas são calculados sobre o valor antigo, e a
+    linha fica travada até o commit (FOR UPDATE no Postgres; no SQLite o próprio INSERT toma o lock
+    de escrita), então nenhuma outra transação muda as faltas entre o evento e o UPDATE.
+    """
+    return insert(FaltaEvento).from_select(
+        ["materia_id", "delta", "faltas", "criado_em"],
+        select(Materia.id, delta, faltas, literal(datetime.now(timezone.utc), FaltaEvento.criado_em.type))
+        .where(*where)
+        .with_for_update(),
+    )
+
+async def get_eventos_by_materia(db: AsyncSession, materia_id: int, limit: int = 100):
+    result = await db.execute(
+        select(FaltaEvento).filter(FaltaEvento.materia_id == materia_id).order_by(FaltaEvento.id.desc()).limit(limit)
+    )
+    return result.scalars().all()
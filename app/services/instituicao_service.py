@@ -1,42 +1,124 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete
+from sqlalchemy.orm import selectinload
 from app.models.instituicao import Instituicao
-from app.schemas.instituicao import InstituicaoCreate, InstituicaoUpdate
-from app.services.usuario_service import get_usuario
+from app.models.usuario import Usuario
+from app.schemas.instituicao import InstituicaoCreate, InstituicaoRead, InstituicaoUpdate
+from app.services.usuario_service import data_version_cache, get_usuario, list_cache, touch_data_version
+from app.core.serialization import dump_trusted
 from fastapi import HTTPException
 
 async def create_instituicao(db: AsyncSession, instituicao: InstituicaoCreate, usuario_id: int):
     if not await get_usuario(db, usuario_id):
         raise HTTPException(status_code=404, detail="Usuário não encontrado")
-    instituicao_obj = Instituicao(**instituicao.model_dump(), usuario_id=usuario_id)
-    db.add(instituicao_obj)
+    # INSERT ... RETURNING: grava e devolve a linha em uma única ida ao banco
+    instituicao_obj = await db.scalar(
+        insert(Instituicao).values(**instituicao.model_dump(), usuario_id=usuario_id).returning(Instituicao)
+    )
+    await touch_data_version(db, usuario_id)
     await db.commit()
-    await db.refresh(instituicao_obj)
     return instituicao_obj
 
 async def get_instituicao(db: AsyncSession, instituicao_id: int):
-    result = await db.execute(select(Instituicao).filter(Instituicao.id == instituicao_id))
-    return result.scalar_one_or_none()
+    # db.get reaproveita o objeto já carregado na sessão, sem nova consulta
+    return await db.get(Instituicao, instituicao_id)
 
-async def get_instituicoes_by_usuario(db: AsyncSession, usuario_id: int):
-    result = await db.execute(select(Instituicao).filter(Instituicao.usuario_id == usuario_id))
-    return result.scalars().all()
+async def get_data_version_and_owner(db: AsyncSession, usuario_id: int, instituicao_id: int) -> tuple[int, int | None]:
+    """data_version do usuário (para o ETag) e dono da instituição em uma única consulta.
+
+    Com a versão em cache não há consulta e o dono volta None, assim como para instituição inexistente.
+    """
+    version = await data_version_cache.get(usuario_id)
+    if version is not None:
+        return version, None
+    dono = select(Instituicao.usuario_id).where(Instituicao.id == instituicao_id).scalar_subquery()
+    row = (await db.execute(select(Usuario.data_version, dono).where(Usuario.id == usuario_id))).one_or_none()
+    if row is None:
+        return 0, None
+    await data_version_cache.add(usuario_id, row[0])
+    return row[0], row[1]
+
+def _instituicao_columns(fields: tuple[str, ...] | None):
+    # Com fields, só as colunas pedidas: o SELECT devolve linhas (Row) em vez de objetos do ORM
+    return (Instituicao,) if fields is None else tuple(getattr(Instituicao, name) for name in fields)
+
+async def get_instituicao_fields(db: AsyncSession, instituicao_id: int, fields: tuple[str, ...]):
+    """Linha só com as colunas pedidas e o dono em dono_id (para a checagem de acesso), ou None"""
+    result = await db.execute(
+        select(*_instituicao_columns(fields), Instituicao.usuario_id.label("dono_id")).where(Instituicao.id == instituicao_id)
+    )
+    return result.one_or_none()
+
+def _instituicoes_by_usuario_query(usuario_id: int, after: int | None = None, fields: tuple[str, ...] | None = None):
+    # Paginação por keyset: ordena pelo id e continua a partir do cursor
+    query = select(*_instituicao_columns(fields)).filter(Instituicao.usuario_id == usuario_id).order_by(Instituicao.id)
+    if after is not None:
+        query = query.filter(Instituicao.id > after)
+    return query
+
+async def get_instituicoes_by_usuario(db: AsyncSession, usuario_id: int, limit: int | None = None, after: int | None = None, fields: tuple[str, ...] | None = None):
+    query = _instituicoes_by_usuario_query(usuario_id, after, fields)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all() if fields is None else result.all()
+
+async def get_instituicoes_page(db: AsyncSession, usuario_id: int, data_version: int, limit: int | None = None, after: int | None = None, fields: tuple[str, ...] | None = None) -> list[dict]:
+    """Página da listagem já serializada (InstituicaoRead), em cache pela versão dos dados do usuário"""
+    key = f"{usuario_id}:instituicoes:{data_version}:{limit}:{after}:{','.join(fields or ('*',))}"
+    page = await list_cache.get(key)
+    if page is None:
+        instituicoes = await get_instituicoes_by_usuario(db, usuario_id, limit=limit, after=after, fields=fields)
+        page = [dump_trusted(instituicao, InstituicaoRead) for instituicao in instituicoes]
+        await list_cache.add(key, page)
+    return page
+
+async def stream_instituicoes_by_usuario(db: AsyncSession, usuario_id: int, after: int | None = None, fields: tuple[str, ...] | None = None):
+    query = _instituicoes_by_usuario_query(usuario_id, after, fields)
+    if fields is None:
+        result = await db.stream_scalars(query, execution_options={"yield_per": 500})
+    else:
+        result = await db.stream(query, execution_options={"yield_per": 500})
+    async for instituicao in result:
+        yield instituicao
+
+async def stream_instituicoes_with_materias(db: AsyncSession, usuario_id: int, batch_size: int = 100):
+    """Instituições do usuário já com as matérias, em lotes (1 + 1 consulta por lote)"""
+    # Lotes por keyset em vez de yield_per: o ORM não combina yield_per com o
+    # selectinload de coleções
+    after = None
+    while True:
+        query = _instituicoes_by_usuario_query(usuario_id, after).options(selectinload(Instituicao.materias)).limit(batch_size)
+        instituicoes = (await db.scalars(query)).all()
+        for instituicao in instituicoes:
+            yield instituicao
+        if len(instituicoes) < batch_size:
+            break
+        after = instituicoes[-1].id
+        # Libera o lote já enviado para a memória não crescer com o tamanho da exportação
+        db.expunge_all()
 
 async def update_instituicao(db: AsyncSession, instituicao_id: int, instituicao_data: InstituicaoUpdate):
-    instituicao = await get_instituicao(db, instituicao_id=instituicao_id)
+    updates = instituicao_data.model_dump(exclude_unset=True)
+    if not updates:
+        return await get_instituicao(db, instituicao_id=instituicao_id)
 
+    # UPDATE ... RETURNING: se a instituição não existir, nenhuma linha volta
+    instituicao = await db.scalar(
+        update(Instituicao).where(Instituicao.id == instituicao_id).values(**updates).returning(Instituicao)
+    )
     if instituicao:
-        for field, value in instituicao_data.model_dump(exclude_unset=True).items():
-            setattr(instituicao, field, value)
-        await db.commit()
-        await db.refresh(instituicao)
-        return instituicao
-    return None
+        await touch_data_version(db, instituicao.usuario_id)
+    await db.commit()
+    return instituicao
 
 async def delete_instituicao(db: AsyncSession, instituicao_id: int):
-    instituicao = await get_instituicao(db, instituicao_id=instituicao_id)
-    if instituicao:
-        await db.delete(instituicao)
-        await db.commit()
-        return True
-    return False
\ No newline at end of file
+    # DELETE único: as matérias (e seus eventos) saem pelo ON DELETE CASCADE do banco
+    usuario_id = await db.scalar(
+        delete(Instituicao).where(Instituicao.id == instituicao_id).returning(Instituicao.usuario_id)
+    )
+    if usuario_id is None:
+        return False
+    await touch_data_version(db, usuario_id)
+    await db.commit()
+    return True
\ No newline at end of file
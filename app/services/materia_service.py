@@ -1,44 +1,186 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete, case
 from app.models.materia import Materia
-from app.schemas.materia import MateriaCreate, MateriaUpdate
+from app.models.instituicao import Instituicao
+from app.models.falta_evento import FaltaEvento
+from app.schemas.materia import MateriaCreate, MateriaRead, MateriaUpdate
+from app.core.horario import CAMPOS_LEGADOS, mascara_dias
+from app.core.serialization import dump_trusted
 from fastapi import HTTPException
 from app.services.instituicao_service import get_instituicao
+from app.services.usuario_service import list_cache, touch_data_version
+from app.services.falta_evento_service import registrar_alteracao, registrar_evento
+
+def _dono_da_instituicao(instituicao_id):
+    # Subconsulta pela chave primária, para incrementar a versão do dono sem carregar a instituição
+    return select(Instituicao.usuario_id).where(Instituicao.id == instituicao_id).scalar_subquery()
 
 async def create_materia(db: AsyncSession, materia: MateriaCreate, instituicao_id: int):
 
-    if not await get_instituicao(db, instituicao_id):
+    instituicao = await get_instituicao(db, instituicao_id)
+    if not instituicao:
         raise HTTPException(status_code=404, detail="Instituição não encontrada")
 
-    materia_obj = Materia(**materia.model_dump(), instituicao_id=instituicao_id)
-    db.add(materia_obj)
+    # INSERT ... RETURNING: grava e devolve a linha em uma única ida ao banco
+    materia_obj = await db.scalar(
+        insert(Materia).values(**materia.model_dump(), instituicao_id=instituicao_id).returning(Materia)
+    )
+    await touch_data_version(db, instituicao.usuario_id)
     await db.commit()
-    await db.refresh(materia_obj)
     return materia_obj
 
+async def create_materias_bulk(db: AsyncSession, materias: list[MateriaCreate], instituicao_id: int):
+    """Insere várias matérias em uma única transação (executemany com RETURNING)"""
+    if not materias:
+        return []
+
+    result = await db.scalars(
+        insert(Materia).returning(Materia),
+        [{**materia.model_dump(), "instituicao_id": instituicao_id} for materia in materias],
+    )
+    # Sem sort_by_parameter_order o SQLite cai para um INSERT por linha; os ids
+    # autoincrementais seguem a ordem do VALUES, então ordenar por id basta
+    materias_obj = sorted(result.all(), key=lambda materia: materia.id)
+    await touch_data_version(db, _dono_da_instituicao(instituicao_id))
+    await db.commit()
+    return materias_obj
+
 async def get_materia(db: AsyncSession, materia_id: int):
-    result = await db.execute(select(Materia).filter(Materia.id == materia_id))
-    return result.scalar_one_or_none()
+    # db.get reaproveita o objeto já carregado na sessão, sem nova consulta
+    return await db.get(Materia, materia_id)
+
+def _materia_columns(fields: tuple[str, ...] | None):
+    # Com fields, só as colunas pedidas: o SELECT devolve linhas (Row) em vez de objetos do ORM.
+    # Rótulo explícito: os campos aulas_<dia> são expressões sobre a coluna horario
+    return (Materia,) if fields is None else tuple(getattr(Materia, name).label(name) for name in fields)
+
+async def get_materia_with_owner(db: AsyncSession, materia_id: int, fields: tuple[str, ...] | None = None):
+    """Retorna (materia, usuario_id do dono) em uma única consulta, ou None.
+
+    Com fields, materia é uma linha só com essas colunas (e o dono em dono_id).
+    """
+    result = await db.execute(
+        select(*_materia_columns(fields), Instituicao.usuario_id.label("dono_id"))
+        .join(Instituicao, Materia.instituicao_id == Instituicao.id)
+        .filter(Materia.id == materia_id)
+    )
+    row = result.one_or_none()
+    if row is None or fields is None:
+        return row
+    return row, row.dono_id
+
+def _materias_by_instituicao_query(instituicao_id: int, after: int | None = None, fields: tuple[str, ...] | None = None):
+    # Paginação por keyset: ordena pelo id e continua a partir do cursor
+    query = select(*_materia_columns(fields)).filter(Materia.instituicao_id == instituicao_id).order_by(Materia.id)
+    if after is not None:
+        query = query.filter(Materia.id > after)
+    return query
+
+async def get_materias_by_instituicao(db: AsyncSession, instituicao_id: int, limit: int | None = None, after: int | None = None, fields: tuple[str, ...] | None = None):
+    query = _materias_by_instituicao_query(instituicao_id, after, fields)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all() if fields is None else result.all()
 
-async def get_materias_by_instituicao(db: AsyncSession, instituicao_id: int):
-    result = await db.execute(select(Materia).filter(Materia.instituicao_id == instituicao_id))
-    return result.scalars().all()
+async def get_materias_page(db: AsyncSession, usuario_id: int, instituicao_id: int, data_version: int, limit: int | None = None, after: int | None = None, fields: tuple[str, ...] | None = None) -> list[dict]:
+    """Página de matérias já serializada (MateriaRead), em cache pela versão dos dados do dono"""
+    key = f"{usuario_id}:materias:{instituicao_id}:{data_version}:{limit}:{after}:{','.join(fields or ('*',))}"
+    page = await list_cache.get(key)
+    if page is None:
+        materias = await get_materias_by_instituicao(db, instituicao_id, limit=limit, after=after, fields=fields)
+        page = [dump_trusted(materia, MateriaRead) for materia in materias]
+        await list_cache.add(key, page)
+    return page
 
-async def update_materia(db: AsyncSession, materia_id: int, materia_data: MateriaUpdate):
-    materia = await get_materia(db, materia_id=materia_id)
+async def stream_materias_by_instituicao(db: AsyncSession, instituicao_id: int, after: int | None = None, fields: tuple[str, ...] | None = None):
+    query = _materias_by_instituicao_query(instituicao_id, after, fields)
+    if fields is None:
+        result = await db.stream_scalars(query, execution_options={"yield_per": 500})
+    else:
+        result = await db.stream(query, execution_options={"yield_per": 500})
+    async for materia in result:
+        yield materia
 
+async def update_materia(db: AsyncSession, materia_id: int, materia_data: MateriaUpdate, faltas_antes: int | None = None):
+    """Altera os campos enviados; faltas_antes (o valor já lido pela rota) evita ler as faltas de novo para o histórico"""
+    updates = materia_data.model_dump(exclude_unset=True)
+    # Campos antigos do horário: troca só os dias enviados, no próprio UPDATE sobre a coluna compactada
+    legados = {dia: updates.pop(campo) for dia, campo in enumerate(CAMPOS_LEGADOS) if campo in updates}
+    legados = {dia: aulas for dia, aulas in legados.items() if aulas is not None}
+    if legados and "horario" not in updates:
+        mantidos, novos = mascara_dias(legados)
+        updates["horario"] = Materia.horario.bitwise_and(mantidos).bitwise_or(novos)
+    if not updates:
+        return await get_materia(db, materia_id=materia_id)
+
+    if updates.get("instituicao_id") is not None:
+        # Mudança de instituição: a listagem (e o ETag) do dono anterior também muda
+        await touch_data_version(db, _dono_da_instituicao(
+            select(Materia.instituicao_id).where(Materia.id == materia_id).scalar_subquery()
+        ))
+
+    # UPDATE ... RETURNING: se a matéria não existir, nenhuma linha volta
+    faltas = updates.get("faltas")
+    materia = None
+    if faltas is None or faltas_antes is not None:
+        # Com faltas, só vale se o valor lido pela rota não mudou no meio: aí a diferença real
+        # é conhecida e o evento sai da linha devolvida
+        guarda = () if faltas is None else (Materia.faltas == faltas_antes,)
+        materia = await db.scalar(
+            update(Materia).where(Materia.id == materia_id, *guarda).values(**updates).returning(Materia)
+        )
+        if materia and faltas is not None and faltas != faltas_antes:
+            await db.execute(registrar_evento(materia.id, faltas - faltas_antes, faltas))
+    if materia is None and faltas is not None:
+        # Valor antigo desconhecido ou alterado por outra transação: evento antes, lendo-o sob lock
+        await db.execute(registrar_alteracao(faltas - Materia.faltas, faltas, Materia.id == materia_id, Materia.faltas != faltas))
+        materia = await db.scalar(
+            update(Materia).where(Materia.id == materia_id).values(**updates).returning(Materia)
+        )
     if materia:
-        for field, value in materia_data.model_dump(exclude_unset=True).items():
-            setattr(materia, field, value)
-        await db.commit()
-        await db.refresh(materia)
-        return materia
-    return None
+        await touch_data_version(db, _dono_da_instituicao(materia.instituicao_id))
+    await db.commit()
+    return materia
 
-async def delete_materia(db: AsyncSession, materia_id: int):
-    materia = await get_materia(db, materia_id=materia_id)
+async def add_faltas(db: AsyncSession, materia_id: int, usuario_id: int, n: int):
+    """Soma n às faltas (n negativo desconta, sem passar de zero) de forma atômica, com o evento no histórico.
+
+    Só altera matérias de instituições do usuário; retorna None se nada foi alterado.
+    """
+    filtro = (
+        Materia.id == materia_id,
+        Materia.instituicao_id.in_(select(Instituicao.id).filter(Instituicao.usuario_id == usuario_id)),
+    )
+    # Caso comum: o desconto não passa de zero, então a diferença aplicada é o próprio n e o
+    # evento sai da linha devolvida pelo UPDATE
+    materia = await db.scalar(
+        update(Materia).where(*filtro, Materia.faltas + n >= 0).values(faltas=Materia.faltas + n).returning(Materia)
+    )
+    if materia is not None and n != 0:
+        await db.execute(registrar_evento(materia.id, n, materia.faltas))
+    elif materia is None and n < 0:
+        # Desconto maior que as faltas: a diferença (no máximo até zero) depende do valor antigo,
+        # então o evento vem antes, lendo-o sob lock; sem alteração real, sem evento
+        delta = case((Materia.faltas + n < 0, -Materia.faltas), else_=n)
+        aplicado = await db.scalar(
+            registrar_alteracao(delta, Materia.faltas + delta, *filtro, delta != 0).returning(FaltaEvento.delta)
+        )
+        materia = await db.scalar(
+            update(Materia).where(*filtro).values(faltas=Materia.faltas + (aplicado or 0)).returning(Materia)
+        )
     if materia:
-        await db.delete(materia)
-        await db.commit()
-        return True
-    return False
\ No newline at end of file
+        await touch_data_version(db, usuario_id)
+    await db.commit()
+    return materia
+
+async def delete_materia(db: AsyncSession, materia_id: int):
+    # Os eventos de falta saem pelo ON DELETE CASCADE do banco
+    instituicao_id = await db.scalar(
+        delete(Materia).where(Materia.id == materia_id).returning(Materia.instituicao_id)
+    )
+    if instituicao_id is None:
+        return False
+    await touch_data_version(db, _dono_da_instituicao(instituicao_id))
+    await db.commit()
+    return True
\ No newline at end of file
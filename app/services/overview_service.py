@@ -0,0 +1,67 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, select, func, case, literal
+from app.models.instituicao import Instituicao
+from app.models.materia import Materia
+
+async def get_overview(db: AsyncSession, usuario_id: int, risk_threshold: float = 0.75):
+    """Resumo de faltas por matéria e por instituição, calculado em uma única consulta.
+
+    limite_faltas é a fração da carga horária que pode ser perdida (0.25); valores
+    acima de 1 são tratados como percentual (25). Uma matéria fica em risco quando
+    as faltas chegam a risk_threshold do permitido; sem faltas permitidas, nunca.
+    """
+    limite = case((Instituicao.limite_faltas > 1, Instituicao.limite_faltas / 100.0), else_=Instituicao.limite_faltas)
+    permitidas = Materia.carga_horaria * limite
+    # Sem faltas permitidas (limite_faltas 0, o padrão) não há como medir o risco
+    em_risco = case((and_(permitidas > 0, Materia.faltas >= permitidas * risk_threshold), 1), else_=0)
+    por_instituicao = {"partition_by": Instituicao.id}
+
+    query = (
+        select(
+            Instituicao.id.label("instituicao_id"),
+            Instituicao.nome.label("instituicao_nome"),
+            Instituicao.limite_faltas,
+            Materia.id.label("materia_id"),
+            Materia.nome.label("materia_nome"),
+            Materia.faltas,
+            permitidas.label("faltas_permitidas"),
+            (permitidas - Materia.faltas).label("faltas_restantes"),
+            case((permitidas > 0, Materia.faltas * literal(100.0) / permitidas), else_=None).label("percentual_usado"),
+            em_risco.label("em_risco"),
+            # Totais da instituição na mesma consulta, via funções de janela
+            func.count(Materia.id).over(**por_instituicao).label("total_materias"),
+            func.coalesce(func.sum(Materia.faltas).over(**por_instituicao), 0).label("total_faltas"),
+            func.coalesce(func.sum(permitidas).over(**por_instituicao), 0).label("total_faltas_permitidas"),
+            func.coalesce(func.sum(em_risco).over(**por_instituicao), 0).label("materias_em_risco"),
+        )
+        .outerjoin(Materia, Materia.instituicao_id == Instituicao.id)
+        .filter(Instituicao.usuario_id == usuario_id)
+        .order_by(Instituicao.id, Materia.id)
+    )
+    result = await db.execute(query)
+
+    instituicoes = {}
+    for row in result:
+        instituicao = instituicoes.get(row.instituicao_id)
+        if instituicao is None:
+            instituicao = instituicoes[row.instituicao_id] = {
+                "id": row.instituicao_id,
+                "nome": row.instituicao_nome,
+                "limite_faltas": row.limite_faltas,
+                "total_materias": row.total_materias,
+                "total_faltas": row.total_faltas,
+                "total_faltas_permitidas": row.total_faltas_permitidas,
+                "materias_em_risco": row.materias_em_risco,
+                "materias": [],
+            }
+        if row.materia_id is not None:
+            instituicao["materias"].append({
+                "id": row.materia_id,
+                "nome": row.materia_nome,
+                "faltas": row.faltas,
+                "faltas_permitidas": row.faltas_permitidas,
+                "faltas_restantes": row.faltas_restantes,
+                "percentual_usado": row.percentual_usado,
+                "em_risco": bool(row.em_risco),
+            })
+    return {"instituicoes": list(instituicoes.values())}
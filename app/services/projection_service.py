@@ -0,0 +1,121 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+from functools import lru_cache
+from math import floor
+from typing import NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from app.core.horario import ponderar
+from app.models.instituicao import Instituicao
+from app.models.materia import Materia
+
+class Projecao(NamedTuple):
+    aulas_restantes: int
+    faltas_projetadas: int
+    data_limite: Optional[date]
+
+class _Calendario:
+    """Contagem de dias da semana em um intervalo, descontando feriados, sem percorrer dia a dia"""
+
+    def __init__(self, inicio: date, fim: date, feriados: tuple[date, ...], faltar: tuple[date, ...]):
+        self.inicio = inicio
+        self.dias = (fim - inicio).days + 1
+        self.feriados = sorted({feriado for feriado in feriados if inicio <= feriado <= fim})
+        # acumulado[i][d] = feriados que caem no dia da semana d entre os i primeiros
+        self.acumulado = [(0,) * 7]
+        for feriado in self.feriados:
+            linha = list(self.acumulado[-1])
+            linha[feriado.weekday()] += 1
+            self.acumulado.append(tuple(linha))
+        self.total = self.contagem(self.dias - 1)
+
+        # Dias que o aluno pretende faltar, agrupados por dia da semana
+        feriados_set = set(self.feriados)
+        self.faltar = [0] * 7
+        for dia in set(faltar):
+            if inicio <= dia <= fim and dia not in feriados_set:
+                self.faltar[dia.weekday()] += 1
+
+    def contagem(self, offset: int) -> list[int]:
+        """Quantas vezes cada dia da semana ocorre de inicio até inicio + offset (inclusive)"""
+        semanas, resto = divmod(offset + 1, 7)
+        contagem = [semanas] * 7
+        primeiro = self.inicio.weekday()
+        for i in range(resto):
+            contagem[(primeiro + i) % 7] += 1
+        feriados = self.acumulado[bisect_right(self.feriados, self.inicio + timedelta(days=offset))]
+        return [c - f for c, f in zip(contagem, feriados)]
+
+@lru_cache(maxsize=256)
+def _calendario(inicio: date, fim: date, feriados: tuple[date, ...], faltar: tuple[date, ...]) -> _Calendario:
+    return _Calendario(inicio, fim, feriados, faltar)
+
+@lru_cache(maxsize=16384)
+def projetar(horario: int, faltas: int, faltas_permitidas: float,
+             inicio: date, fim: date, feriados: tuple[date, ...] = (), faltar: tuple[date, ...] = ()) -> Projecao:
+    """Projeta uma matéria no intervalo [inicio, fim].
+
+    horario: horário semanal compactado (coluna materias.horario, ver app.core.horario).
+    aulas_restantes: aulas previstas pelo horário semanal, sem feriados.
+    faltas_projetadas: faltas atuais mais as aulas dos dias em faltar.
+    data_limite: primeiro dia em que, faltando a todas as aulas a partir de inicio,
+    as faltas passariam do permitido; None se isso não acontece no intervalo.
+
+    Memoizado pelo conteúdo da matéria e pelo intervalo: matérias iguais, ou a
+    mesma matéria sem alterações, reaproveitam o resultado.
+    """
+    calendario = _calendario(inicio, fim, feriados, faltar)
+    aulas_restantes = ponderar(horario, calendario.total)
+    faltas_projetadas = faltas + ponderar(horario, calendario.faltar)
+
+    # Aulas que ainda podem ser perdidas antes de passar do limite, mais uma
+    necessarias = floor(faltas_permitidas) + 1 - faltas
+    if necessarias <= 0:
+        return Projecao(aulas_restantes, faltas_projetadas, inicio)
+    if aulas_restantes < necessarias:
+        return Projecao(aulas_restantes, faltas_projetadas, None)
+
+    # Busca binária sobre o dia: as aulas acumuladas só crescem com o tempo
+    baixo, alto = 0, calendario.dias - 1
+    while baixo < alto:
+        meio = (baixo + alto) // 2
+        if ponderar(horario, calendario.contagem(meio)) >= necessarias:
+            alto = meio
+        else:
+            baixo = meio + 1
+    return Projecao(aulas_restantes, faltas_projetadas, inicio + timedelta(days=baixo))
+
+def faltas_permitidas(carga_horaria: int, limite_faltas: float) -> float:
+    # Mesmo critério do resumo: acima de 1 o limite está em percentual
+    fracao = limite_faltas / 100 if limite_faltas > 1 else limite_faltas
+    return carga_horaria * fracao
+
+async def get_projection(db: AsyncSession, usuario_id: int, inicio: date, fim: date,
+                         feriados: list[date], faltar: list[date]):
+    """Projeta todas as matérias do usuário no intervalo, com o cenário de faltas informado"""
+    query = (
+        select(Materia, Instituicao.limite_faltas)
+        .join(Instituicao, Materia.instituicao_id == Instituicao.id)
+        .filter(Instituicao.usuario_id == usuario_id)
+        .order_by(Materia.id)
+    )
+    result = await db.execute(query)
+
+    feriados_key = tuple(sorted(set(feriados)))
+    faltar_key = tuple(sorted(set(faltar)))
+    projecoes = []
+    for materia, limite_faltas in result:
+        permitidas = faltas_permitidas(materia.carga_horaria, limite_faltas)
+        projecao = projetar(materia.horario, materia.faltas, permitidas, inicio, fim, feriados_key, faltar_key)
+        projecoes.append({
+            "id": materia.id,
+            "nome": materia.nome,
+            "instituicao_id": materia.instituicao_id,
+            "faltas": materia.faltas,
+            "faltas_permitidas": permitidas,
+            "aulas_restantes": projecao.aulas_restantes,
+            "faltas_projetadas": projecao.faltas_projetadas,
+            "faltas_restantes": permitidas - projecao.faltas_projetadas,
+            "data_limite": projecao.data_limite,
+        })
+    return projecoes
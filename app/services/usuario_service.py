@@ -1,58 +1,121 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, delete
 from app.models.usuario import Usuario
 from app.schemas.usuario import UsuarioCreate, UsuarioUpdate, UsuarioLogin, UsuarioRead, UsuarioChangePassword
-from app.core.auth import verify_password, get_password_hash, create_access_token
+from app.services.email_index_service import email_changed, email_index
+from app.core.auth import AUTH_CACHE_SIZE, AUTH_CACHE_TTL, verify_password_async, get_password_hash_async, create_access_token, user_claims
+from app.core.shared_cache import CACHE_LIST_SIZE, CACHE_SIZE, Cache
+
+# Versões por usuário (id -> versão) e páginas de listagem já serializadas.
+# As chaves das páginas começam por "{usuario_id}:" e levam a data_version, então
+# escritas não precisam invalidá-las; só a exclusão do usuário limpa o prefixo
+# Todos só com nível compartilhado (CACHE_URL): sem ele, outro worker não saberia das escritas.
+# Uma revogação (logout, troca de senha) seria ignorada até AUTH_CACHE_TTL e ETags e páginas
+# ficariam velhos até o TTL; nesse caso as versões são lidas do banco a cada requisição
+token_version_cache = Cache("token_version", AUTH_CACHE_SIZE, AUTH_CACHE_TTL, requires_shared=True)
+data_version_cache = Cache("data_version", CACHE_SIZE, requires_shared=True)
+list_cache = Cache("list_page", CACHE_LIST_SIZE, requires_shared=True)
 
 async def create_usuario(db: AsyncSession, usuario_data: UsuarioCreate):
     usuario_dict = usuario_data.model_dump()
-    usuario_dict['senha'] = get_password_hash(usuario_dict['senha'])
+    usuario_dict['senha'] = await get_password_hash_async(usuario_dict['senha'])
 
-    usuario = Usuario(**usuario_dict)
-    db.add(usuario)
+    # INSERT ... RETURNING: grava e devolve a linha em uma única ida ao banco
+    usuario = await db.scalar(insert(Usuario).values(**usuario_dict).returning(Usuario))
     await db.commit()
-    await db.refresh(usuario)
+    email_index.add(usuario.email)
     return usuario
 
 async def get_usuario(db: AsyncSession, usuario_id: int):
-    result = await db.execute(select(Usuario).filter(Usuario.id == usuario_id))
-    return result.scalar_one_or_none()
+    # db.get reaproveita o objeto já carregado na sessão, sem nova consulta
+    return await db.get(Usuario, usuario_id)
+
+async def touch_data_version(db: AsyncSession, usuario_id):
+    """Incrementa a versão dos dados do usuário na transação atual (usuario_id pode ser uma subconsulta)"""
+    result = await db.execute(
+        update(Usuario).where(Usuario.id == usuario_id).values(data_version=Usuario.data_version + 1)
+        .returning(Usuario.id, Usuario.data_version),
+        execution_options={"synchronize_session": False},
+    )
+    # O cache só recebe a versão nova depois do commit; o dono passa a ler do principal
+    for id_, version in result:
+        data_version_cache.set_after_commit(db, id_, version)
+        db.info.setdefault("written_users", set()).add(id_)
+
+async def get_data_version(db: AsyncSession, usuario_id: int) -> int | None:
+    """Versão dos dados do usuário: do cache ou da tabela usuarios (busca pela chave primária)"""
+    version = await data_version_cache.get(usuario_id)
+    if version is None:
+        version = await db.scalar(select(Usuario.data_version).where(Usuario.id == usuario_id))
+        if version is not None:
+            await data_version_cache.add(usuario_id, version)
+    return version
+
+async def get_token_version(db: AsyncSession, usuario_id: int) -> int | None:
+    """Versão atual dos tokens do usuário (None se ele não existe), em geral vinda do cache"""
+    version = await token_version_cache.get(usuario_id)
+    if version is None:
+        version = await db.scalar(select(Usuario.token_version).where(Usuario.id == usuario_id))
+        if version is not None:
+            await token_version_cache.add(usuario_id, version)
+    return version
+
+async def revoke_tokens(db: AsyncSession, usuario_id: int) -> bool:
+    """Invalida todos os tokens já emitidos para o usuário (troca de senha, logout)"""
+    version = await db.scalar(
+        update(Usuario).where(Usuario.id == usuario_id).values(token_version=Usuario.token_version + 1)
+        .returning(Usuario.token_version)
+    )
+    await db.commit()
+    if version is None:
+        return False
+    # Os outros workers descartam a versão antiga ao receber a invalidação
+    await token_version_cache.set(usuario_id, version)
+    return True
 
 async def get_usuario_by_email(db: AsyncSession, email: str):
     result = await db.execute(select(Usuario).filter(Usuario.email == email))
     return result.scalar_one_or_none()
 
 async def update_usuario(db: AsyncSession, usuario_id: int, usuario_data: UsuarioUpdate):
-    usuario = await get_usuario(db, usuario_id=usuario_id)
-
-    if usuario:
-        updates = usuario_data.model_dump(exclude_unset=True)
+    updates = usuario_data.model_dump(exclude_unset=True)
+    if not updates:
+        return await get_usuario(db, usuario_id=usuario_id)
 
-        if 'senha' in updates:
-            updates['senha'] = get_password_hash(updates.pop('senha'))
+    if 'senha' in updates:
+        updates['senha'] = await get_password_hash_async(updates.pop('senha'))
 
-        for field, value in updates.items():
-            setattr(usuario, field, value)
-        await db.commit()
-        await db.refresh(usuario)
-        return usuario
-    return None
+    # UPDATE ... RETURNING: se o usuário não existir, nenhuma linha volta
+    usuario = await db.scalar(
+        update(Usuario).where(Usuario.id == usuario_id).values(**updates).returning(Usuario)
+    )
+    await db.commit()
+    if usuario and 'email' in updates:
+        await email_changed(usuario.email)
+    return usuario
 
 async def delete_usuario(db: AsyncSession, usuario_id: int):
-    usuario = await get_usuario(db, usuario_id=usuario_id)
-    if usuario:
-        await db.delete(usuario)
-        await db.commit()
-        return True
-    return False
+    # DELETE único: instituições, matérias e eventos saem pelo ON DELETE CASCADE do banco,
+    # sem carregar nada na memória
+    deleted = await db.scalar(delete(Usuario).where(Usuario.id == usuario_id).returning(Usuario.id))
+    await db.commit()
+    if deleted is None:
+        return False
+    # O id não volta (AUTOINCREMENT), mas nada do usuário apagado deve sobrar no cache
+    await token_version_cache.invalidate(usuario_id)
+    await data_version_cache.invalidate(usuario_id)
+    await list_cache.invalidate_prefix(f"{usuario_id}:")
+    return True
 
 async def login_usuario(db: AsyncSession, credentials: UsuarioLogin):
     usuario = await get_usuario_by_email(db, credentials.email)
+    # Devolve a conexão ao pool antes do bcrypt, que leva centenas de ms
+    await db.commit()
 
-    if not usuario or not verify_password(credentials.senha, usuario.senha):
+    if not usuario or not await verify_password_async(credentials.senha, usuario.senha):
         return False
     
-    token = create_access_token(data={"sub": usuario.email})
+    token = create_access_token(data=user_claims(usuario.id, usuario.email, usuario.token_version))
     usuario_data = UsuarioRead.model_validate(usuario)
     return {
         "access_token": token,
@@ -62,16 +125,47 @@ async def login_usuario(db: AsyncSession, credentials: UsuarioLogin):
 
 async def change_password(db: AsyncSession, usuario_id: int, password_data: UsuarioChangePassword):
     usuario = await get_usuario(db, usuario_id=usuario_id)
+    # Devolve a conexão ao pool antes do bcrypt, que leva centenas de ms
+    await db.commit()
 
-    if not usuario or not verify_password(password_data.old_senha, usuario.senha):
+    if not usuario or not await verify_password_async(password_data.old_senha, usuario.senha):
         return False
 
-    new_password_hash = get_password_hash(password_data.new_senha)
-    usuario.senha = new_password_hash
+    new_password_hash = await get_password_hash_async(password_data.new_senha)
+    # Troca a senha e revoga as sessões abertas na mesma escrita
+    version = await db.scalar(
+        update(Usuario).where(Usuario.id == usuario_id)
+        .values(senha=new_password_hash, token_version=Usuario.token_version + 1)
+        .returning(Usuario.token_version)
+    )
     await db.commit()
-    await db.refresh(usuario)
+    if version is not None:
+        await token_version_cache.set(usuario_id, version)
     return True
 
-async def get_all_users(db: AsyncSession):
-    result = await db.execute(select(Usuario))
-    return result.scalars().all()
\ No newline at end of file
+async def toggle_premium(db: AsyncSession, usuario_id: int):
+    # Inverte no próprio UPDATE, sem ler o valor atual antes
+    usuario = await db.scalar(
+        update(Usuario).where(Usuario.id == usuario_id).values(is_premium=~Usuario.is_premium).returning(Usuario)
+    )
+    await db.commit()
+    return usuario
+
+def _all_users_query(after: int | None = None):
+    # Paginação por keyset: ordena pelo id e continua a partir do cursor
+    query = select(Usuario).order_by(Usuario.id)
+    if after is not None:
+        query = query.filter(Usuario.id > after)
+    return query
+
+async def get_all_users(db: AsyncSession, limit: int | None = None, after: int | None = None):
+    query = _all_users_query(after)
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    return result.scalars().all()
+
+async def stream_all_users(db: AsyncSession, after: int | None = None):
+    result = await db.stream_scalars(_all_users_query(after), execution_options={"yield_per": 500})
+    async for usuario in result:
+        yield usuario
\ No newline at end of file
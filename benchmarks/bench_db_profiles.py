@@ -0,0 +1,81 @@
+"""
+Vazão do banco em cada perfil de DB_PROFILE (dev, prod, test).
+
+Uso: python -m benchmarks.bench_db_profiles [operacoes_por_worker] [workers]
+Usa um SQLite temporário por perfil; com BENCH_DATABASE_URL testa outro banco.
+"""
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db_profiles import PROFILES, create_engine_for_profile
+from app.db.database import Base
+from app.models.usuario import Usuario
+from app.models.instituicao import Instituicao
+from app.schemas.materia import MateriaCreate, MateriaUpdate
+from app.services.materia_service import create_materia, get_materias_by_instituicao, update_materia
+
+OPERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+WORKERS = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+
+MATERIA = MateriaCreate(
+    nome="Cálculo", carga_horaria=60, faltas=0, status="cursando", horario=[2, 0, 2, 0, 0, 0, 0],
+)
+
+async def run_profile(name: str):
+    db_file = None
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{db_file}"
+    engine = create_engine_for_profile(url, name)
+    # O custo do echo continua na medida, mas a saída vai para /dev/null
+    for handler in logging.getLogger("sqlalchemy.engine.Engine").handlers:
+        handler.setStream(open(os.devnull, "w"))
+    Session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with Session() as db:
+        usuario = Usuario(nome="Bench", email="bench@skipd.com", senha="x")
+        db.add(usuario)
+        await db.flush()
+        instituicao = Instituicao(nome="Bench", limite_faltas=0.25, usuario_id=usuario.id)
+        db.add(instituicao)
+        await db.commit()
+        instituicao_id = instituicao.id
+
+    async def worker():
+        for i in range(OPERATIONS):
+            async with Session() as db:
+                materia = await create_materia(db, MATERIA, instituicao_id)
+            async with Session() as db:
+                await update_materia(db, materia.id, MateriaUpdate(faltas=i))
+            async with Session() as db:
+                await get_materias_by_instituicao(db, instituicao_id, limit=20)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(WORKERS)))
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    if db_file:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_file + suffix):
+                os.remove(db_file + suffix)
+
+    total = OPERATIONS * WORKERS * 3
+    print(f"{name:<5} {total} operações em {elapsed:6.2f}s  ->  {total / elapsed:8.1f} ops/s")
+
+async def main():
+    for name in PROFILES:
+        await run_profile(name)
+
+if __name__ == "__main__":
+    asyncio.run(main())
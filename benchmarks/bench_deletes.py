@@ -0,0 +1,56 @@
+"""
+Exclusão de contas grandes: consultas, tempo e pico de memória do delete_usuario.
+
+Uso: python -m benchmarks.bench_deletes
+Para cada tamanho, gera um usuário com instituições × matérias num SQLite
+temporário e apaga a conta. Com ON DELETE CASCADE no banco o número de consultas e
+a memória não devem crescer com o tamanho da conta.
+"""
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+
+# A URL precisa estar definida antes de importar a engine da aplicação
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+
+from sqlalchemy import event, func, select
+
+from app.db.database import AsyncSessionLocal, engine
+from app.db.schema import upgrade_to_head
+from app.models.materia import Materia
+from app.services.usuario_service import delete_usuario
+from benchmarks.dataset import seed
+
+# (instituições, matérias por instituição)
+TAMANHOS = [(1, 10), (10, 100), (50, 200), (100, 500)]
+
+async def main():
+    await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+    consultas = [0]
+    def contar(*args):
+        consultas[0] += 1
+    event.listen(engine.sync_engine, "before_cursor_execute", contar)
+
+    print(f"{'instituições':>12} {'matérias':>9} {'consultas':>10} {'ms':>9} {'pico KiB':>9}")
+    for instituicoes, materias in TAMANHOS:
+        async with AsyncSessionLocal() as db:
+            await seed(db, 1, instituicoes, materias)
+
+        consultas[0] = 0
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        async with AsyncSessionLocal() as db:
+            assert await delete_usuario(db, 1)
+        duracao = (time.perf_counter() - inicio) * 1000
+        _, pico = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        async with AsyncSessionLocal() as db:
+            assert await db.scalar(select(func.count()).select_from(Materia)) == 0
+        print(f"{instituicoes:>12} {instituicoes * materias:>9} {consultas[0]:>10} {duracao:>9.1f} {pico / 1024:>9.0f}")
+    await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,258 @@
+"""
+Carga nos endpoints HTTP, com a aplicação rodando em processo (ASGI) sobre uma massa gerada.
+
+Uso: python -m benchmarks.bench_endpoints [--users 10000] [--requests 500] [--concurrency 16]
+                                          [--save] [--check] [--baseline ARQUIVO]
+
+Cria um SQLite temporário, aplica as migrações e gera usuarios × 3 instituições × 8
+matérias. Para cada endpoint mede p50/p95/p99, vazão e consultas ao banco por
+requisição, e compara com o baseline versionado (bench_endpoints_baseline.json).
+--save grava o resultado como novo baseline; --check sai com código 1 se algum
+endpoint fizer mais consultas ou ficar mais lento que a tolerância (BENCH_TOLERANCE).
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# A URL precisa estar definida antes de importar a engine da aplicação
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+# Todos os logins saem do mesmo IP: o limitador de tentativas recusaria a carga
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+from sqlalchemy import event
+
+from app.core.auth import PASSWORD_HASH_WORKERS, create_access_token, get_password_hash, user_claims
+from app.db.database import AsyncSessionLocal, engine
+from app.db.schema import upgrade_to_head
+from app.main import app, lifespan
+from benchmarks.dataset import email, seed
+
+INSTITUICOES_POR_USUARIO = 3
+MATERIAS_POR_INSTITUICAO = 8
+SENHA = "senha-bench"
+BASELINE = Path(__file__).with_name("bench_endpoints_baseline.json")
+TOLERANCE = float(os.getenv("BENCH_TOLERANCE", "0.25"))
+
+# Contador de consultas da requisição em andamento (uma lista por tarefa)
+_statements = contextvars.ContextVar("statements", default=None)
+
+def _count_statement(*args):
+    contador = _statements.get()
+    if contador is not None:
+        contador[0] += 1
+
+def _percentile(ordenados: list[float], p: float) -> float:
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+class Dataset:
+    def __init__(self, usuarios: int, seed_value: int = 42):
+        self.usuarios = usuarios
+        self.random = random.Random(seed_value)
+        self._tokens = {}
+        # ETag por URL de listagem já buscada, para o cenário de GET condicional
+        self.etags = {}
+        # Matérias ainda não apagadas pelo cenário de delete
+        self._deletaveis = self.random.sample(range(1, usuarios * INSTITUICOES_POR_USUARIO * MATERIAS_POR_INSTITUICAO + 1),
+                                              min(usuarios, 5000))
+
+    def usuario(self) -> int:
+        return self.random.randint(1, self.usuarios)
+
+    def instituicao(self, usuario_id: int) -> int:
+        return (usuario_id - 1) * INSTITUICOES_POR_USUARIO + self.random.randint(1, INSTITUICOES_POR_USUARIO)
+
+    def materia(self, usuario_id: int) -> int:
+        return (self.instituicao(usuario_id) - 1) * MATERIAS_POR_INSTITUICAO + self.random.randint(1, MATERIAS_POR_INSTITUICAO)
+
+    def dono(self, materia_id: int) -> int:
+        instituicao_id = (materia_id - 1) // MATERIAS_POR_INSTITUICAO + 1
+        return (instituicao_id - 1) // INSTITUICOES_POR_USUARIO + 1
+
+    def materia_deletavel(self) -> int:
+        return self._deletaveis.pop()
+
+    def headers(self, usuario_id: int) -> dict:
+        # Mesmas claims do login, sem pagar o bcrypt para montar a massa
+        token = self._tokens.get(usuario_id)
+        if token is None:
+            token = self._tokens[usuario_id] = create_access_token(user_claims(usuario_id, email(usuario_id), 0))
+        return {"Authorization": f"Bearer {token}"}
+
+def _login(c, d):
+    return c.post("/api/token", data={"username": email(d.usuario()), "password": SENHA})
+
+def _check_email(c, d):
+    # Formulário de cadastro: a maior parte das verificações é de emails ainda livres
+    u = d.usuario()
+    endereco = email(u) if d.random.random() < 0.1 else f"novo{u}@skipd.com"
+    return c.post("/api/user/check-email", json={"email": endereco})
+
+def _get_user(c, d):
+    u = d.usuario()
+    return c.get(f"/api/user/{u}", headers=d.headers(u))
+
+def _list_instituicoes(c, d):
+    u = d.usuario()
+    return c.get(f"/api/instituition/all/{u}", headers=d.headers(u))
+
+async def _list_materias(c, d):
+    u = d.usuario()
+    url = f"/api/subject/all/{d.instituicao(u)}"
+    response = await c.get(url, headers=d.headers(u))
+    if "etag" in response.headers:
+        d.etags[url] = (u, response.headers["etag"])
+    return response
+
+def _list_materias_not_modified(c, d):
+    # Revalida uma listagem já buscada; sem escritas no meio, a resposta é 304
+    url, (u, etag) = d.random.choice(list(d.etags.items()))
+    return c.get(url, headers={**d.headers(u), "If-None-Match": etag})
+
+def _get_materia(c, d):
+    u = d.usuario()
+    return c.get(f"/api/subject/{d.materia(u)}", headers=d.headers(u))
+
+def _overview(c, d):
+    u = d.usuario()
+    return c.get("/api/overview", headers=d.headers(u))
+
+def _update_materia(c, d):
+    u = d.usuario()
+    return c.put(f"/api/subject/{d.materia(u)}", json={"faltas": d.random.randint(0, 10)}, headers=d.headers(u))
+
+def _delete_materia(c, d):
+    materia_id = d.materia_deletavel()
+    return c.delete(f"/api/subject/{materia_id}", headers=d.headers(d.dono(materia_id)))
+
+# (nome, requisição, fração de --requests, limite de concorrência)
+# O login é limitado pelo bcrypt: mais concorrência que o pool de hash só gera fila e 503
+SCENARIOS = [
+    ("POST /token", _login, 0.05, PASSWORD_HASH_WORKERS),
+    ("POST /user/check-email", _check_email, 1, None),
+    ("GET /user/{id}", _get_user, 1, None),
+    ("GET /instituition/all/{id}", _list_instituicoes, 1, None),
+    ("GET /subject/all/{id}", _list_materias, 1, None),
+    ("GET /subject/all/{id} (304)", _list_materias_not_modified, 1, None),
+    ("GET /subject/{id}", _get_materia, 1, None),
+    ("GET /overview", _overview, 1, None),
+    ("PUT /subject/{id}", _update_materia, 1, None),
+    ("DELETE /subject/{id}", _delete_materia, 1, None),
+]
+
+async def run_scenario(client, dataset, request, total: int, concurrency: int) -> dict:
+    latencias = []
+    consultas = []
+    erros = 0
+    semaforo = asyncio.Semaphore(concurrency)
+
+    async def one():
+        nonlocal erros
+        async with semaforo:
+            contador = [0]
+            _statements.set(contador)
+            inicio = time.perf_counter()
+            response = await request(client, dataset)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(contador[0])
+            if response.status_code >= 400:
+                erros += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    duracao = time.perf_counter() - inicio
+
+    latencias.sort()
+    return {
+        "requests": total,
+        "errors": erros,
+        "p50_ms": round(_percentile(latencias, 50), 2),
+        "p95_ms": round(_percentile(latencias, 95), 2),
+        "p99_ms": round(_percentile(latencias, 99), 2),
+        "throughput_rps": round(total / duracao, 1),
+        "statements_per_request": round(sum(consultas) / len(consultas), 2),
+    }
+
+def _delta(atual: float, base: float) -> str:
+    if not base:
+        return "    -"
+    return f"{(atual - base) / base * 100:+5.0f}%"
+
+def report(config: dict, resultados: dict, baseline: dict | None) -> list[str]:
+    """Imprime a tabela e devolve as regressões em relação ao baseline"""
+    base = (baseline or {}).get("results", {})
+    if baseline and baseline.get("config") != config:
+        print(f"Aviso: baseline gerado com outra configuração {baseline.get('config')}\n")
+
+    print(f"{'endpoint':<28} {'n':>5} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'req/s':>8} {'sql':>5}   {'Δp95':>6} {'Δreq/s':>6} {'Δsql':>5}")
+    regressoes = []
+    for nome, r in resultados.items():
+        b = base.get(nome)
+        linha = (f"{nome:<28} {r['requests']:>5} {r['errors']:>4} {r['p50_ms']:>8.2f} {r['p95_ms']:>8.2f} "
+                 f"{r['p99_ms']:>8.2f} {r['throughput_rps']:>8.1f} {r['statements_per_request']:>5.2f}")
+        if b:
+            linha += (f"   {_delta(r['p95_ms'], b['p95_ms']):>6} {_delta(r['throughput_rps'], b['throughput_rps']):>6} "
+                      f"{r['statements_per_request'] - b['statements_per_request']:>+5.2f}")
+            # Folga para acertos de cache que variam com a ordem das requisições concorrentes
+            if r["statements_per_request"] > b["statements_per_request"] + 0.05:
+                regressoes.append(f"{nome}: {b['statements_per_request']} -> {r['statements_per_request']} consultas por requisição")
+            if r["p95_ms"] > b["p95_ms"] * (1 + TOLERANCE):
+                regressoes.append(f"{nome}: p95 {b['p95_ms']}ms -> {r['p95_ms']}ms")
+        print(linha)
+    return regressoes
+
+async def main(args) -> int:
+    config = {
+        "users": args.users,
+        "institutions_per_user": INSTITUICOES_POR_USUARIO,
+        "subjects_per_institution": MATERIAS_POR_INSTITUICAO,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+    }
+    await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+    inicio = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        await seed(db, args.users, INSTITUICOES_POR_USUARIO, MATERIAS_POR_INSTITUICAO, get_password_hash(SENHA))
+    print(f"Massa: {args.users} usuários, {args.users * INSTITUICOES_POR_USUARIO * MATERIAS_POR_INSTITUICAO} matérias "
+          f"({time.perf_counter() - inicio:.1f}s)\n")
+
+    event.listen(engine.sync_engine, "before_cursor_execute", _count_statement)
+    dataset = Dataset(args.users)
+    resultados = {}
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for nome, request, fracao, limite in SCENARIOS:
+                concorrencia = min(args.concurrency, limite or args.concurrency)
+                total = max(concorrencia, int(args.requests * fracao))
+                resultados[nome] = await run_scenario(client, dataset, request, total, concorrencia)
+
+    baseline_path = Path(args.baseline)
+    baseline = json.loads(baseline_path.read_text()) if baseline_path.exists() else None
+    regressoes = report(config, resultados, None if args.save else baseline)
+
+    if args.save:
+        baseline_path.write_text(json.dumps({"config": config, "results": resultados}, indent=2, ensure_ascii=False) + "\n")
+        print(f"\nBaseline gravado em {baseline_path}")
+    elif regressoes:
+        print("\nRegressões:")
+        for regressao in regressoes:
+            print(f"  {regressao}")
+    return 1 if args.check and regressoes else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=500, help="requisições por endpoint")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--baseline", default=str(BASELINE))
+    parser.add_argument("--save", action="store_true", help="grava o resultado como baseline")
+    parser.add_argument("--check", action="store_true", help="código de saída 1 em caso de regressão")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,118 @@
+"""
+Custo das métricas (middleware + eventos da engine + pool com medição) por requisição.
+
+Uso: python -m benchmarks.bench_metrics [requisicoes] [rodadas]
+Cada rodada sobe a aplicação em um processo novo com METRICS_ENABLED=false e
+outro com true, alternando para diluir ruído, e mede requisições sequenciais
+de leitura e escrita sobre uma massa pequena.
+"""
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# --child: processo filho que sobe a aplicação e imprime as medidas em JSON
+CHILD = "--child" in sys.argv
+ARGS = [arg for arg in sys.argv[1:] if arg != "--child"]
+REQUESTS = int(ARGS[0]) if len(ARGS) > 0 else 2000
+ROUNDS = int(ARGS[1]) if len(ARGS) > 1 else 5
+
+async def _child():
+    os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+
+    import httpx
+    from app.core.auth import create_access_token, user_claims
+    from app.db.database import AsyncSessionLocal
+    from app.db.schema import upgrade_to_head
+    from app.main import app, lifespan
+    from benchmarks.dataset import email, seed
+
+    await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+    async with AsyncSessionLocal() as db:
+        await seed(db, 100, 3, 8)
+    headers = {"Authorization": f"Bearer {create_access_token(user_claims(1, email(1), 0))}"}
+
+    resultados = {}
+    async with lifespan(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            for nome, request in (
+                ("GET /subject/{id}", lambda i: client.get(f"/api/subject/{i % 24 + 1}", headers=headers)),
+                ("PUT /subject/{id}", lambda i: client.put(f"/api/subject/{i % 24 + 1}", json={"faltas": i % 5}, headers=headers)),
+            ):
+                for i in range(50):
+                    await request(i)
+                inicio = time.perf_counter()
+                for i in range(REQUESTS):
+                    await request(i)
+                resultados[nome] = (time.perf_counter() - inicio) / REQUESTS * 1e6
+    print(json.dumps(resultados))
+
+def _run(enabled: bool) -> dict:
+    env = {**os.environ, "METRICS_ENABLED": "true" if enabled else "false", "DB_PROFILE": os.getenv("DB_PROFILE", "prod")}
+    saida = subprocess.run([sys.executable, "-m", "benchmarks.bench_metrics", "--child", str(REQUESTS)],
+                           env=env, capture_output=True, text=True, check=True)
+    return json.loads(saida.stdout.strip().splitlines()[-1])
+
+async def _micro(iteracoes: int = 100000) -> tuple[float, float]:
+    """Custo isolado em µs: middleware por requisição e eventos da engine por consulta"""
+    from types import SimpleNamespace
+    from sqlalchemy import create_engine, text
+    from app.core.metrics import MetricsMiddleware, instrument_engine
+
+    class Route:
+        path = "/api/subject/{materia_id}"
+
+    async def endpoint(scope, receive, send):
+        scope["route"] = Route
+        await send({"type": "http.response.start", "status": 200})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        pass
+
+    async def por_chamada(app):
+        inicio = time.perf_counter()
+        for _ in range(iteracoes):
+            await app({"type": "http", "method": "GET"}, None, send)
+        return (time.perf_counter() - inicio) / iteracoes * 1e6
+
+    middleware = min([await por_chamada(MetricsMiddleware(endpoint)) for _ in range(3)]) - min([await por_chamada(endpoint) for _ in range(3)])
+
+    def por_consulta(engine, n=20000):
+        with engine.connect() as conn:
+            inicio = time.perf_counter()
+            for _ in range(n):
+                conn.execute(text("SELECT 1"))
+            return (time.perf_counter() - inicio) / n * 1e6
+
+    # Engine síncrona: sem o salto de thread do aiosqlite, o custo dos eventos aparece
+    puro = create_engine("sqlite://")
+    medido = create_engine("sqlite://")
+    instrument_engine(SimpleNamespace(sync_engine=medido), "bench")
+    consulta = min(por_consulta(medido) for _ in range(3)) - min(por_consulta(puro) for _ in range(3))
+    return middleware, consulta
+
+def main():
+    middleware, consulta = asyncio.run(_micro())
+    print(f"Custo isolado: middleware {middleware:.1f}µs por requisição, eventos da engine {consulta:.1f}µs por consulta\n")
+
+    medidas = {False: [], True: []}
+    for _ in range(ROUNDS):
+        for enabled in (False, True):
+            medidas[enabled].append(_run(enabled))
+
+    print(f"{REQUESTS} requisições sequenciais por rodada, {ROUNDS} rodadas (mediana em µs/requisição)")
+    for nome in medidas[False][0]:
+        sem = statistics.median(m[nome] for m in medidas[False])
+        com = statistics.median(m[nome] for m in medidas[True])
+        print(f"{nome:<20} sem métricas={sem:8.1f}  com métricas={com:8.1f}  custo={com - sem:+7.1f}µs ({(com - sem) / sem * 100:+.1f}%)")
+
+if __name__ == "__main__":
+    if CHILD:
+        asyncio.run(_child())
+    else:
+        main()
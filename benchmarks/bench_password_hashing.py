@@ -0,0 +1,76 @@
+"""
+Mede a latência de rotas GET não relacionadas enquanto logins (bcrypt) rodam em paralelo.
+
+Uso: python -m benchmarks.bench_password_hashing [logins_concorrentes] [requisicoes_get]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file.name}"
+# Todos os logins saem do mesmo IP: o limitador de tentativas recusaria a carga
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+from app.main import app, lifespan
+from app.db.database import engine
+
+LOGINS = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+GETS = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+async def measure_gets(client: httpx.AsyncClient, count: int, interval: float = 0.05):
+    """Dispara GETs em horários fixos; a latência conta a partir do horário previsto,
+    então o tempo em que o event loop ficou travado entra na medida."""
+
+    async def timed_get(scheduled: float):
+        await client.get("/api/user")
+        return (time.perf_counter() - scheduled) * 1000
+
+    start = time.perf_counter()
+    tasks = []
+    while len(tasks) < count:
+        now = time.perf_counter()
+        while len(tasks) < count and start + len(tasks) * interval <= now:
+            tasks.append(asyncio.create_task(timed_get(start + len(tasks) * interval)))
+        await asyncio.sleep(interval / 2)
+    return await asyncio.gather(*tasks)
+
+async def login(client: httpx.AsyncClient):
+    await client.post("/api/token", data={"username": "bench@skipd.com", "password": "bench"})
+
+def report(label, latencies):
+    print(f"{label:<22} p50={statistics.median(latencies):8.2f}ms  p99={percentile(latencies, 99):8.2f}ms  max={max(latencies):8.2f}ms")
+
+async def main():
+    engine.echo = False
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            await client.post("/api/user", json={"nome": "Bench", "email": "bench@skipd.com", "senha": "bench"})
+
+            # Aquece o backend do bcrypt antes de medir
+            await login(client)
+
+            report("GET idle", await measure_gets(client, GETS))
+
+            gets = asyncio.create_task(measure_gets(client, GETS))
+            start = time.perf_counter()
+            await asyncio.gather(*(login(client) for _ in range(LOGINS)))
+            login_time = time.perf_counter() - start
+            report(f"GET + {LOGINS} logins", await gets)
+            print(f"{LOGINS} logins em {login_time:.2f}s")
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        os.remove(_db_file.name)
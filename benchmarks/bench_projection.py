@@ -0,0 +1,70 @@
+"""
+Projeção de faltas para milhares de matérias: motor por contagem de dias da semana
+contra uma referência que percorre o calendário dia a dia.
+
+Uso: python -m benchmarks.bench_projection [materias]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from app.core.horario import empacotar
+from app.services.projection_service import projetar, _calendario
+
+SUBJECTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+INICIO = date(2026, 8, 3)
+FIM = date(2026, 12, 18)
+FERIADOS = (date(2026, 9, 7), date(2026, 10, 12), date(2026, 11, 2), date(2026, 11, 20))
+FALTAR = (date(2026, 8, 10), date(2026, 8, 11))
+
+def referencia(horario, faltas, permitidas):
+    """Implementação direta, um dia por vez"""
+    feriados = set(FERIADOS)
+    aulas = 0
+    data_limite = None
+    dia = INICIO
+    while dia <= FIM:
+        if dia not in feriados:
+            aulas += horario[dia.weekday()]
+            if data_limite is None and faltas + aulas > permitidas:
+                data_limite = dia
+        dia += timedelta(days=1)
+    if faltas > permitidas:
+        data_limite = INICIO
+    extra = sum(horario[d.weekday()] for d in FALTAR if d not in feriados)
+    return aulas, faltas + extra, data_limite
+
+def main():
+    rng = random.Random(42)
+    materias = []
+    for _ in range(SUBJECTS):
+        horario = tuple(rng.choice((0, 0, 0, 2, 4)) for _ in range(7))
+        carga = rng.choice((30, 60, 90))
+        materias.append((horario, rng.randint(0, 20), carga * 0.25))
+
+    start = time.perf_counter()
+    esperado = [referencia(*m) for m in materias]
+    tempo_referencia = time.perf_counter() - start
+
+    projetar.cache_clear()
+    _calendario.cache_clear()
+    start = time.perf_counter()
+    # O motor recebe o horário compactado, como vem da coluna materias.horario
+    compactadas = [(empacotar(horario), faltas, permitidas) for horario, faltas, permitidas in materias]
+    obtido = [tuple(projetar(*m, INICIO, FIM, FERIADOS, FALTAR)) for m in compactadas]
+    tempo_frio = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for m in compactadas:
+        projetar(*m, INICIO, FIM, FERIADOS, FALTAR)
+    tempo_memo = time.perf_counter() - start
+
+    assert obtido == esperado, "projeção diverge da referência"
+    print(f"{SUBJECTS} matérias, {(FIM - INICIO).days + 1} dias")
+    print(f"referência dia a dia   {tempo_referencia * 1000:9.1f}ms")
+    print(f"motor (cache frio)     {tempo_frio * 1000:9.1f}ms")
+    print(f"motor (memoizado)      {tempo_memo * 1000:9.1f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Serialização das listagens: response_model do FastAPI x trusted_response.
+
+Uso: python -m benchmarks.bench_serialization [linhas] [repeticoes]
+Carrega as linhas de um SQLite temporário pelos próprios services e mede só a
+conversão em corpo JSON (sem HTTP nem banco): o caminho padrão do FastAPI valida
+cada objeto no response_model, gera os dicionários e chama json.dumps; o
+trusted_response monta os dicionários direto das linhas e serializa com orjson.
+"""
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+# A URL precisa estar definida antes de importar a engine da aplicação
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from sqlalchemy import insert
+
+from app.api.serialization import trusted_response
+from app.core.horario import empacotar
+from app.db.database import AsyncSessionLocal, engine
+from app.db.schema import upgrade_to_head
+from app.models.materia import Materia
+from app.schemas.materia import MateriaRead
+from app.schemas.usuario import UsuarioRead
+from app.services.materia_service import get_materias_by_instituicao
+from app.services.usuario_service import get_all_users
+from benchmarks.dataset import seed
+
+LINHAS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+REPETICOES = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+async def fastapi_body(field, items) -> bytes:
+    """O que a rota faz com response_model e retorno em objetos do ORM"""
+    conteudo = await serialize_response(field=field, response_content=items)
+    return JSONResponse(conteudo).body
+
+async def trusted_body(schema, items) -> bytes:
+    return trusted_response(items, schema).body
+
+async def _medir(funcao, *args) -> float:
+    """Menor tempo em ms entre as repetições"""
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        inicio = time.perf_counter()
+        await funcao(*args)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor * 1000
+
+async def seed_materias(db):
+    """Completa a instituição 1 até LINHAS matérias"""
+    await db.execute(insert(Materia), [
+        {"nome": f"Matéria {m}", "carga_horaria": 60, "faltas": m % 7, "status": "cursando", "instituicao_id": 1,
+         "horario": empacotar([2, 0, 2, 0, 0, 0, 0])}
+        for m in range(LINHAS - 1)
+    ])
+    await db.commit()
+
+async def main():
+    await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+    async with AsyncSessionLocal() as db:
+        # Uma instituição com LINHAS matérias e LINHAS usuários
+        await seed(db, LINHAS, 1, 1)
+        await seed_materias(db)
+        materias = await get_materias_by_instituicao(db, 1, limit=LINHAS)
+        usuarios = await get_all_users(db, limit=LINHAS)
+    await engine.dispose()
+
+    print(f"{LINHAS} linhas, melhor de {REPETICOES} repetições (ms)")
+    for nome, schema, items in (("MateriaRead", MateriaRead, materias), ("UsuarioRead", UsuarioRead, usuarios)):
+        field = create_model_field(name="Response", type_=list[schema], mode="serialization")
+        # Mesmo JSON nos dois caminhos (a ordem das chaves segue o schema)
+        assert json.loads(await fastapi_body(field, items)) == json.loads(await trusted_body(schema, items))
+        padrao = await _medir(fastapi_body, field, items)
+        rapido = await _medir(trusted_body, schema, items)
+        print(f"{nome:<12} response_model={padrao:7.2f}  trusted_response={rapido:7.2f}  ({padrao / rapido:.1f}x)")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""
+Custo do startup: create_all (comportamento antigo) x conferência da versão do esquema.
+
+Uso: python -m benchmarks.bench_startup [repeticoes]
+Migra um SQLite temporário e mede cada estratégia com uma engine nova por rodada
+(conexão fria, como num boot). Com BENCH_DATABASE_URL testa outro banco já migrado.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.db.database import Base
+from app.db.schema import ensure_schema, upgrade_to_head
+from app.models import usuario, instituicao, materia, falta_evento  # noqa: F401
+
+REPETITIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+
+async def create_all(engine):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+async def measure(url: str, name: str, startup):
+    tempos = []
+    statements = 0
+    for _ in range(REPETITIONS):
+        engine = create_async_engine(url, poolclass=NullPool)
+        contador = [0]
+        event.listen(engine.sync_engine, "before_cursor_execute", lambda *a: contador.__setitem__(0, contador[0] + 1))
+        inicio = time.perf_counter()
+        await startup(engine)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        await engine.dispose()
+        statements = contador[0]
+    tempos.sort()
+    print(f"{name:<14} mediana={statistics.median(tempos):6.2f}ms  p95={tempos[int(len(tempos) * 0.95) - 1]:6.2f}ms  consultas={statements}")
+
+async def main(url: str):
+    await measure(url, "create_all", create_all)
+    await measure(url, "ensure_schema", ensure_schema)
+
+if __name__ == "__main__":
+    url = os.getenv("BENCH_DATABASE_URL")
+    if not url:
+        db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+        url = f"sqlite+aiosqlite:///{db_file}"
+        upgrade_to_head(url)
+    asyncio.run(main(url))
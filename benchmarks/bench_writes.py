@@ -0,0 +1,70 @@
+"""
+Latência das escritas da camada de serviço (create/update) direto no banco.
+
+Uso: python -m benchmarks.bench_writes [iteracoes]
+Usa DATABASE_URL se definida; caso contrário, um SQLite temporário.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+_db_file = None
+if not os.getenv("DATABASE_URL"):
+    _db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{_db_file.name}"
+
+from app.db.database import Base, engine, AsyncSessionLocal
+from app.models.usuario import Usuario
+from app.schemas.instituicao import InstituicaoCreate, InstituicaoUpdate
+from app.schemas.materia import MateriaCreate, MateriaUpdate
+from app.services.instituicao_service import create_instituicao, update_instituicao
+from app.services.materia_service import create_materia, update_materia
+
+ITERATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+MATERIA = MateriaCreate(
+    nome="Cálculo", carga_horaria=60, faltas=0, status="cursando", horario=[2, 0, 2, 0, 0, 0, 0],
+)
+
+async def timed(label, func):
+    latencies = []
+    for i in range(ITERATIONS):
+        # Sessão nova a cada operação, como em uma requisição
+        async with AsyncSessionLocal() as db:
+            start = time.perf_counter()
+            await func(db, i)
+            latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label:<20} mean={statistics.mean(latencies):6.3f}ms  p50={statistics.median(latencies):6.3f}ms  p99={p99:6.3f}ms")
+
+async def main():
+    engine.echo = False
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with AsyncSessionLocal() as db:
+        usuario = Usuario(nome="Bench", email="bench@skipd.com", senha="x")
+        db.add(usuario)
+        await db.commit()
+        usuario_id = usuario.id
+        instituicao = await create_instituicao(db, InstituicaoCreate(nome="Bench", limite_faltas=0.25), usuario_id)
+        instituicao_id = instituicao.id
+        materia = await create_materia(db, MATERIA, instituicao_id)
+        materia_id = materia.id
+
+    await timed("create_instituicao", lambda db, i: create_instituicao(db, InstituicaoCreate(nome=f"I{i}", limite_faltas=0.25), usuario_id))
+    await timed("update_instituicao", lambda db, i: update_instituicao(db, instituicao_id, InstituicaoUpdate(nome=f"I{i}")))
+    await timed("create_materia", lambda db, i: create_materia(db, MATERIA, instituicao_id))
+    await timed("update_materia", lambda db, i: update_materia(db, materia_id, MateriaUpdate(faltas=i)))
+    await engine.dispose()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    finally:
+        if _db_file is not None:
+            os.remove(_db_file.name)
@@ -0,0 +1,49 @@
+"""
+Massa de dados sintética usada pelos benchmarks.
+
+Gera usuarios × instituicoes × materias com ids previsíveis: o usuário u tem as
+instituições (u-1)*I+1 .. u*I e a instituição i tem as matérias (i-1)*M+1 .. i*M.
+"""
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.horario import empacotar
+from app.models.usuario import Usuario
+from app.models.instituicao import Instituicao
+from app.models.materia import Materia
+
+BATCH_SIZE = 5000
+# Duas aulas na segunda e na quarta
+HORARIO = empacotar([2, 0, 2, 0, 0, 0, 0])
+
+def email(usuario_id: int) -> str:
+    return f"u{usuario_id}@skipd.com"
+
+async def _insert_batches(db: AsyncSession, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            await db.execute(insert(model), batch)
+            batch = []
+    if batch:
+        await db.execute(insert(model), batch)
+
+async def seed(db: AsyncSession, usuarios: int, instituicoes_por_usuario: int, materias_por_instituicao: int,
+               senha_hash: str = "x"):
+    """Insere a massa em lotes (executemany) e faz commit"""
+    await _insert_batches(db, Usuario, (
+        {"id": u, "nome": f"Usuário {u}", "email": email(u), "senha": senha_hash, "is_premium": False, "url_foto": ""}
+        for u in range(1, usuarios + 1)
+    ))
+    await _insert_batches(db, Instituicao, (
+        {"id": (u - 1) * instituicoes_por_usuario + i, "nome": f"Instituição {u}-{i}", "limite_faltas": 0.25, "usuario_id": u}
+        for u in range(1, usuarios + 1) for i in range(1, instituicoes_por_usuario + 1)
+    ))
+    total_instituicoes = usuarios * instituicoes_por_usuario
+    await _insert_batches(db, Materia, (
+        {"id": (i - 1) * materias_por_instituicao + m, "nome": f"Matéria {i}-{m}", "carga_horaria": 60, "faltas": 0,
+         "status": "cursando", "instituicao_id": i, "horario": HORARIO}
+        for i in range(1, total_instituicoes + 1) for m in range(1, materias_por_instituicao + 1)
+    ))
+    await db.commit()
@@ -0,0 +1,76 @@
+"""
+Casos de borda do resumo de faltas (get_overview), conferidos contra valores esperados.
+
+Uso: python -m benchmarks.overview_check
+Migra um SQLite temporário, cria um usuário com instituições de limite fracionário,
+percentual, zero (o padrão) e sem matérias, e sai com código 1 se algum campo divergir.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# A URL precisa estar definida antes de importar a engine da aplicação
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+
+from sqlalchemy import insert
+
+from app.db.database import AsyncSessionLocal, engine
+from app.db.schema import upgrade_to_head
+from app.models.instituicao import Instituicao
+from app.models.materia import Materia
+from app.models.usuario import Usuario
+from app.services.overview_service import get_overview
+from benchmarks.dataset import HORARIO
+
+# (limite_faltas, [(carga_horaria, faltas)], esperado por instituição, esperado por matéria)
+CASES = [
+    ("fração", 0.25, [(60, 0), (60, 12)],
+     {"total_materias": 2, "total_faltas": 12, "total_faltas_permitidas": 30, "materias_em_risco": 1},
+     [{"faltas_permitidas": 15, "em_risco": False, "percentual_usado": 0},
+      {"faltas_permitidas": 15, "em_risco": True, "percentual_usado": 80}]),
+    ("percentual", 25, [(60, 11)],
+     {"total_materias": 1, "materias_em_risco": 0},
+     [{"faltas_permitidas": 15, "faltas_restantes": 4, "em_risco": False}]),
+    # Limite padrão: nada permitido, mas também nada medido como risco
+    ("limite zero", 0.0, [(60, 0), (60, 3)],
+     {"total_materias": 2, "total_faltas": 3, "total_faltas_permitidas": 0, "materias_em_risco": 0},
+     [{"faltas_permitidas": 0, "em_risco": False, "percentual_usado": None},
+      {"faltas_permitidas": 0, "em_risco": False, "percentual_usado": None}]),
+    ("sem matérias", 0.25, [],
+     {"total_materias": 0, "total_faltas": 0, "total_faltas_permitidas": 0, "materias_em_risco": 0},
+     []),
+]
+
+def _diff(nome: str, obtido: dict, esperado: dict) -> list[str]:
+    return [f"{nome}.{campo}: {obtido.get(campo)!r}, esperado {valor!r}"
+            for campo, valor in esperado.items() if obtido.get(campo) != valor]
+
+async def main() -> int:
+    await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Usuario).values(id=1, nome="U", email="u@skipd.com", senha="x", url_foto=""))
+        for instituicao_id, (nome, limite, materias, _, _) in enumerate(CASES, start=1):
+            await db.execute(insert(Instituicao).values(id=instituicao_id, nome=nome, limite_faltas=limite, usuario_id=1))
+            for carga, faltas in materias:
+                await db.execute(insert(Materia).values(nome=f"{nome} {faltas}", carga_horaria=carga, faltas=faltas,
+                                                        status="cursando", instituicao_id=instituicao_id, horario=HORARIO))
+        await db.commit()
+        overview = await get_overview(db, 1)
+    await engine.dispose()
+
+    falhas = []
+    for (nome, _, _, esperado, esperadas), instituicao in zip(CASES, overview["instituicoes"]):
+        falhas += _diff(nome, instituicao, esperado)
+        if len(instituicao["materias"]) != len(esperadas):
+            falhas.append(f"{nome}: {len(instituicao['materias'])} matérias, esperadas {len(esperadas)}")
+        for indice, (materia, esperada) in enumerate(zip(instituicao["materias"], esperadas)):
+            falhas += _diff(f"{nome}[{indice}]", materia, esperada)
+
+    for falha in falhas:
+        print(f"FALHA {falha}")
+    print(f"{len(CASES)} instituições, {len(falhas)} divergência(s)")
+    return len(falhas)
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main()) else 0)
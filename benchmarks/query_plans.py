@@ -0,0 +1,143 @@
+"""
+Regressão de planos de consulta: roda EXPLAIN em cada consulta dos services.
+
+Uso: python -m benchmarks.query_plans
+Migra um SQLite temporário (alembic upgrade head), executa cada service capturando
+o SQL emitido e falha (código de saída 1) se alguma consulta virar varredura de
+tabela. No SQLite usa EXPLAIN QUERY PLAN; com BENCH_DATABASE_URL apontando para um
+Postgres já migrado usa EXPLAIN (FORMAT JSON) com enable_seqscan desligado, para
+que só sobre Seq Scan onde não existe índice utilizável.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import date
+
+# A URL precisa estar definida antes de importar a engine da aplicação
+if not os.getenv("BENCH_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+else:
+    os.environ["DATABASE_URL"] = os.environ["BENCH_DATABASE_URL"]
+
+from sqlalchemy import event
+
+from app.db.database import AsyncSessionLocal, Base, engine
+from app.db.schema import upgrade_to_head
+from app.schemas.instituicao import InstituicaoUpdate
+from app.schemas.materia import MateriaUpdate
+from app.schemas.usuario import UsuarioUpdate
+from app.services import email_index_service, falta_evento_service, instituicao_service, materia_service, overview_service, projection_service, usuario_service
+from benchmarks.dataset import email, seed
+
+USUARIOS = 200
+INSTITUICOES_POR_USUARIO = 3
+MATERIAS_POR_INSTITUICAO = 5
+
+async def _consume(stream):
+    async for _ in stream:
+        pass
+
+# (nome, chamada, tabelas em que a varredura completa é esperada)
+CASES = [
+    ("get_usuario", lambda db: usuario_service.get_usuario(db, 10), set()),
+    ("get_usuario_by_email", lambda db: usuario_service.get_usuario_by_email(db, email(10)), set()),
+    ("email_in_use", lambda db: email_index_service.email_in_use(db, email(10), exclude_id=10), set()),
+    ("update_usuario", lambda db: usuario_service.update_usuario(db, 10, UsuarioUpdate(nome="Novo")), set()),
+    ("toggle_premium", lambda db: usuario_service.toggle_premium(db, 10), set()),
+    ("get_token_version", lambda db: usuario_service.get_token_version(db, 11), set()),
+    ("revoke_tokens", lambda db: usuario_service.revoke_tokens(db, 11), set()),
+    # Listagem completa de usuários: percorrer a tabela é o próprio objetivo
+    ("get_all_users", lambda db: usuario_service.get_all_users(db, limit=50), {"usuarios"}),
+    ("get_all_users(after)", lambda db: usuario_service.get_all_users(db, limit=50, after=100), set()),
+    ("get_instituicao", lambda db: instituicao_service.get_instituicao(db, 30), set()),
+    ("get_instituicoes_by_usuario", lambda db: instituicao_service.get_instituicoes_by_usuario(db, 10, limit=50), set()),
+    ("get_instituicoes_by_usuario(after)", lambda db: instituicao_service.get_instituicoes_by_usuario(db, 10, limit=50, after=28), set()),
+    ("get_data_version_and_owner", lambda db: instituicao_service.get_data_version_and_owner(db, 10, 30), set()),
+    ("get_instituicao_fields", lambda db: instituicao_service.get_instituicao_fields(db, 30, ("id", "nome")), set()),
+    ("stream_instituicoes_with_materias", lambda db: _consume(instituicao_service.stream_instituicoes_with_materias(db, 10)), set()),
+    ("update_instituicao", lambda db: instituicao_service.update_instituicao(db, 30, InstituicaoUpdate(nome="Nova")), set()),
+    ("get_materia", lambda db: materia_service.get_materia(db, 100), set()),
+    ("get_materia_with_owner", lambda db: materia_service.get_materia_with_owner(db, 100), set()),
+    ("get_materias_by_instituicao", lambda db: materia_service.get_materias_by_instituicao(db, 30, limit=50), set()),
+    ("get_materias_by_instituicao(after)", lambda db: materia_service.get_materias_by_instituicao(db, 30, limit=50, after=146), set()),
+    ("get_materias_by_instituicao(fields)", lambda db: materia_service.get_materias_by_instituicao(db, 30, limit=50, fields=("id", "nome", "faltas", "status")), set()),
+    ("get_materia_with_owner(fields)", lambda db: materia_service.get_materia_with_owner(db, 100, ("id", "nome")), set()),
+    ("update_materia", lambda db: materia_service.update_materia(db, 100, MateriaUpdate(faltas=2)), set()),
+    ("add_faltas", lambda db: materia_service.add_faltas(db, 100, 7, 1), set()),
+    ("get_eventos_by_materia", lambda db: falta_evento_service.get_eventos_by_materia(db, 100), set()),
+    ("get_overview", lambda db: overview_service.get_overview(db, 10), set()),
+    ("get_projection", lambda db: projection_service.get_projection(db, 10, date(2026, 3, 2), date(2026, 6, 30), [], []), set()),
+    ("delete_materia", lambda db: materia_service.delete_materia(db, 101), set()),
+    ("delete_instituicao", lambda db: instituicao_service.delete_instituicao(db, 31), set()),
+    ("delete_usuario", lambda db: usuario_service.delete_usuario(db, 20), set()),
+]
+
+def _is_explainable(statement: str) -> bool:
+    return statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE")
+
+async def explain_sqlite(conn, statement, parameters):
+    """Retorna (tabelas varridas, linhas do plano)"""
+    rows = (await conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)).all()
+    plano = [row[-1] for row in rows]
+    # "SCAN tabela" é varredura; "SEARCH ... USING INDEX" é busca indexada.
+    # SCAN de subconsulta (ex.: funções de janela) percorre só o resultado já filtrado
+    varridas = {linha.split()[1] for linha in plano if linha.startswith("SCAN ")} & Base.metadata.tables.keys()
+    return varridas, plano
+
+def _seq_scans(node, tabelas):
+    if node.get("Node Type") == "Seq Scan":
+        tabelas.add(node["Relation Name"])
+    for filho in node.get("Plans", []):
+        _seq_scans(filho, tabelas)
+    return tabelas
+
+async def explain_postgres(conn, statement, parameters):
+    await conn.exec_driver_sql("SET enable_seqscan = off")
+    plano = (await conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters)).scalar()
+    raiz = plano[0]["Plan"]
+    return _seq_scans(raiz, set()), [raiz["Node Type"]]
+
+async def main():
+    if not os.getenv("BENCH_DATABASE_URL"):
+        await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+        async with AsyncSessionLocal() as db:
+            await seed(db, USUARIOS, INSTITUICOES_POR_USUARIO, MATERIAS_POR_INSTITUICAO)
+    explain = explain_postgres if engine.dialect.name == "postgresql" else explain_sqlite
+
+    capturadas = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and _is_explainable(statement):
+            capturadas.append((statement, parameters))
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+
+    falhas = 0
+    for nome, chamada, permitidas in CASES:
+        capturadas.clear()
+        async with AsyncSessionLocal() as db:
+            await chamada(db)
+        consultas = list(capturadas)
+
+        # EXPLAIN fora da captura para não entrar na lista da próxima chamada
+        event.remove(engine.sync_engine, "before_cursor_execute", capture)
+        falhas_antes = falhas
+        async with engine.connect() as conn:
+            for statement, parameters in consultas:
+                varridas, plano = await explain(conn, statement, parameters)
+                inesperadas = varridas - permitidas
+                if inesperadas:
+                    falhas += 1
+                    print(f"FALHA {nome}: varredura em {', '.join(sorted(inesperadas))}")
+                    print(f"      {' '.join(statement.split())[:160]}")
+                    for linha in plano:
+                        print(f"      | {linha}")
+        event.listen(engine.sync_engine, "before_cursor_execute", capture)
+        if falhas == falhas_antes:
+            print(f"ok    {nome} ({len(consultas)} consulta(s))")
+
+    await engine.dispose()
+    print(f"\n{len(CASES)} services, {falhas} consulta(s) com varredura de tabela")
+    return falhas
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main()) else 0)
@@ -0,0 +1,123 @@
+"""
+Consultas por requisição nas rotas de matéria e instituição.
+
+Uso: python -m benchmarks.route_queries
+Migra um SQLite temporário, gera uma massa pequena e chama cada rota pela aplicação
+em processo (ASGI), contando os statements emitidos durante a requisição. Falha
+(código de saída 1) se alguma rota fizer mais de duas leituras (a checagem de dono
+sai junto com a linha alvo, na mesma consulta) ou passar do total previsto, que
+nas escritas inclui o próprio INSERT/UPDATE/DELETE e o bump de data_version.
+Os casos de 403 e 404 também contam: a distinção sai do mesmo resultado.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+
+# A URL precisa estar definida antes de importar a engine da aplicação
+os.environ["DATABASE_URL"] = "sqlite+aiosqlite:///" + tempfile.NamedTemporaryFile(suffix=".db", delete=False).name
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx
+from sqlalchemy import event
+
+from app.core.auth import create_access_token, user_claims
+from app.db.database import AsyncSessionLocal, engine
+from app.db.schema import upgrade_to_head
+from app.main import app, lifespan
+from benchmarks.dataset import email, seed
+
+USUARIOS = 3
+INSTITUICOES_POR_USUARIO = 2
+MATERIAS_POR_INSTITUICAO = 3
+MAX_LEITURAS = 2
+
+MATERIA = {"nome": "Nova", "carga_horaria": 60, "faltas": 0, "status": "cursando", "horario": [2, 0, 2, 0, 0, 0, 0]}
+
+# Usuário 1: instituições 1-2 e matérias 1-6; usuário 2: instituições 3-4 e matérias 7-12
+# (nome, método, url, corpo, status esperado, total de statements)
+CASES = [
+    ("GET /subject/{id}", "GET", "/api/subject/1", None, 200, 1),
+    ("GET /subject/{id} (outro dono)", "GET", "/api/subject/7", None, 403, 1),
+    ("GET /subject/{id} (inexistente)", "GET", "/api/subject/999", None, 404, 1),
+    ("GET /subject/{id}?fields", "GET", "/api/subject/1?fields=id,nome", None, 200, 1),
+    ("GET /subject/all/{id}", "GET", "/api/subject/all/1", None, 200, 2),
+    ("GET /subject/all/{id} (outro dono)", "GET", "/api/subject/all/3", None, 403, 1),
+    ("GET /subject/all/{id} (inexistente)", "GET", "/api/subject/all/999", None, 404, 2),
+    ("GET /subject/all/{id}?stream", "GET", "/api/subject/all/1?stream=true", None, 200, 2),
+    ("GET /subject/{id}/absences", "GET", "/api/subject/1/absences", None, 200, 2),
+    ("POST /subject/{id}", "POST", "/api/subject/1", MATERIA, 201, 3),
+    ("POST /subject/{id} (outro dono)", "POST", "/api/subject/3", MATERIA, 403, 1),
+    ("POST /subject/bulk/{id}", "POST", "/api/subject/bulk/1", [MATERIA, MATERIA], 200, 3),
+    ("PUT /subject/{id}", "PUT", "/api/subject/1", {"nome": "Renomeada"}, 200, 3),
+    ("PUT /subject/{id} (faltas)", "PUT", "/api/subject/1", {"faltas": 2}, 200, 4),
+    ("PUT /subject/{id} (outro dono)", "PUT", "/api/subject/7", {"nome": "x"}, 403, 1),
+    ("PUT /subject/{id} (mover)", "PUT", "/api/subject/3", {"instituicao_id": 2}, 200, 5),
+    ("PUT /subject/{id} (mover para outro dono)", "PUT", "/api/subject/3", {"instituicao_id": 3}, 403, 2),
+    ("POST /subject/{id}/absences", "POST", "/api/subject/1/absences", {"n": 1}, 200, 3),
+    ("POST /subject/{id}/absences (outro dono)", "POST", "/api/subject/7/absences", {"n": 1}, 403, 3),
+    ("DELETE /subject/{id}", "DELETE", "/api/subject/2", None, 200, 3),
+    ("DELETE /subject/{id} (outro dono)", "DELETE", "/api/subject/8", None, 403, 1),
+    ("GET /instituition/{id}", "GET", "/api/instituition/1", None, 200, 1),
+    ("GET /instituition/{id} (outro dono)", "GET", "/api/instituition/3", None, 403, 1),
+    ("GET /instituition/{id}?fields", "GET", "/api/instituition/1?fields=id,nome", None, 200, 1),
+    ("GET /instituition/all/{id}", "GET", "/api/instituition/all/1", None, 200, 2),
+    ("GET /instituition/all/{id} (outro usuário)", "GET", "/api/instituition/all/2", None, 403, 0),
+    ("PUT /instituition/{id}", "PUT", "/api/instituition/1", {"nome": "Renomeada"}, 200, 3),
+    ("PUT /instituition/{id} (outro dono)", "PUT", "/api/instituition/3", {"nome": "x"}, 403, 1),
+    ("DELETE /instituition/{id}", "DELETE", "/api/instituition/2", None, 200, 3),
+    ("DELETE /instituition/{id} (outro dono)", "DELETE", "/api/instituition/4", None, 403, 1),
+]
+
+def _is_read(statement: str) -> bool:
+    return statement.lstrip().split(None, 1)[0].upper() == "SELECT"
+
+def _is_token_check(statement: str) -> bool:
+    # Conferência do token em get_current_user: igual em todas as rotas (sem CACHE_URL, uma leitura
+    # por requisição), então fica fora da conta de cada rota
+    return _is_read(statement) and "usuarios.token_version" in statement.split("FROM", 1)[0]
+
+async def main() -> int:
+    await asyncio.to_thread(upgrade_to_head, os.environ["DATABASE_URL"])
+    async with AsyncSessionLocal() as db:
+        await seed(db, USUARIOS, INSTITUICOES_POR_USUARIO, MATERIAS_POR_INSTITUICAO)
+
+    capturados = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if not _is_token_check(statement):
+            capturados.append(statement)
+
+    headers = {"Authorization": f"Bearer {create_access_token(user_claims(1, email(1), 0))}"}
+    falhas = 0
+    async with lifespan(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            # Uma requisição antes da contagem: a carga do índice de emails (tarefa do startup) termina nela
+            await client.get("/api/user/1", headers=headers)
+            event.listen(engine.sync_engine, "before_cursor_execute", capture)
+            for nome, metodo, url, corpo, esperado, total in CASES:
+                capturados.clear()
+                response = await client.request(metodo, url, json=corpo, headers=headers)
+                leituras = sum(1 for statement in capturados if _is_read(statement))
+                erros = []
+                if response.status_code != esperado:
+                    erros.append(f"status {response.status_code}, esperado {esperado}")
+                if leituras > MAX_LEITURAS:
+                    erros.append(f"{leituras} leituras, máximo {MAX_LEITURAS}")
+                if len(capturados) > total:
+                    erros.append(f"{len(capturados)} statements, previstos {total}")
+                if erros:
+                    falhas += 1
+                    print(f"FALHA {nome}: {'; '.join(erros)}")
+                    for statement in capturados:
+                        print(f"      | {' '.join(statement.split())[:160]}")
+                else:
+                    print(f"ok    {nome} ({len(capturados)} statement(s), {leituras} leitura(s))")
+            event.remove(engine.sync_engine, "before_cursor_execute", capture)
+
+    await engine.dispose()
+    print(f"\n{len(CASES)} requisições, {falhas} acima do previsto")
+    return falhas
+
+if __name__ == "__main__":
+    sys.exit(1 if asyncio.run(main()) else 0)
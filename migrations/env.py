@@ -0,0 +1,61 @@
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from alembic.script import ScriptDirectory
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app.core.database import Base, DATABASE_URL
+from app.db.schema import SCHEMA_REVISION
+# Registra todas as tabelas no metadata
+from app.models import usuario, instituicao, materia, falta_evento  # noqa: F401
+
+config = context.config
+
+# Quando chamado pela aplicação (MIGRATE_ON_STARTUP) o logging já está configurado
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+# O startup compara o banco com SCHEMA_REVISION; os dois precisam andar juntos
+head = ScriptDirectory.from_config(config).get_current_head()
+if head != SCHEMA_REVISION:
+    raise RuntimeError(f"Atualize SCHEMA_REVISION em app/db/schema.py para {head!r}")
+
+# sqlalchemy.url (alembic.ini ou Config da aplicação) tem prioridade sobre DATABASE_URL
+url = config.get_main_option("sqlalchemy.url") or DATABASE_URL
+
+
+def run_migrations_offline() -> None:
+    """Gera o SQL das migrações sem conectar no banco (alembic upgrade --sql)"""
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection) -> None:
+    # render_as_batch: o SQLite não suporta a maioria dos ALTER TABLE
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(url, poolclass=NullPool)
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_async_migrations())
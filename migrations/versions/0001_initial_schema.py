@@ -0,0 +1,93 @@
+"""Esquema inicial (tabelas que antes eram criadas com create_all)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bancos criados pelo antigo create_all já têm as tabelas: só passam a ser versionados
+    existentes = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "usuarios" not in existentes:
+        op.create_table(
+            "usuarios",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("nome", sa.String(), nullable=False),
+            sa.Column("email", sa.String(), nullable=False),
+            sa.Column("senha", sa.String(), nullable=False),
+            sa.Column("is_premium", sa.Boolean(), nullable=False),
+            sa.Column("url_foto", sa.String(), nullable=False),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("email"),
+        )
+        op.create_index("ix_usuarios_id", "usuarios", ["id"])
+
+    if "instituicoes" not in existentes:
+        op.create_table(
+            "instituicoes",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("nome", sa.String(), nullable=False),
+            sa.Column("limite_faltas", sa.Float(), nullable=False),
+            sa.Column("usuario_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["usuario_id"], ["usuarios.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_instituicoes_id", "instituicoes", ["id"])
+
+    if "materias" not in existentes:
+        op.create_table(
+            "materias",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("nome", sa.String(), nullable=False),
+            sa.Column("carga_horaria", sa.Integer(), nullable=False),
+            sa.Column("faltas", sa.Integer(), nullable=False),
+            sa.Column("status", sa.String(), nullable=False),
+            sa.Column("aulas_domingo", sa.Integer(), nullable=False),
+            sa.Column("aulas_segunda", sa.Integer(), nullable=False),
+            sa.Column("aulas_terca", sa.Integer(), nullable=False),
+            sa.Column("aulas_quarta", sa.Integer(), nullable=False),
+            sa.Column("aulas_quinta", sa.Integer(), nullable=False),
+            sa.Column("aulas_sexta", sa.Integer(), nullable=False),
+            sa.Column("aulas_sabado", sa.Integer(), nullable=False),
+            sa.Column("instituicao_id", sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(["instituicao_id"], ["instituicoes.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_materias_id", "materias", ["id"])
+
+    if "faltas_eventos" not in existentes:
+        op.create_table(
+            "faltas_eventos",
+            sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column("materia_id", sa.Integer(), nullable=False),
+            sa.Column("delta", sa.Integer(), nullable=False),
+            sa.Column("faltas", sa.Integer(), nullable=False),
+            sa.Column("criado_em", sa.DateTime(timezone=True), nullable=False),
+            sa.ForeignKeyConstraint(["materia_id"], ["materias.id"], ondelete="CASCADE"),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_faltas_eventos_materia_id", "faltas_eventos", ["materia_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_faltas_eventos_materia_id", table_name="faltas_eventos")
+    op.drop_table("faltas_eventos")
+    op.drop_index("ix_materias_id", table_name="materias")
+    op.drop_table("materias")
+    op.drop_index("ix_instituicoes_id", table_name="instituicoes")
+    op.drop_table("instituicoes")
+    op.drop_index("ix_usuarios_id", table_name="usuarios")
+    op.drop_table("usuarios")
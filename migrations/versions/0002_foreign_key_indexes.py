@@ -0,0 +1,27 @@
+"""Índices nas chaves estrangeiras de instituicoes e materias
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_instituicoes_usuario_id_id", "instituicoes", ["usuario_id", "id"])
+    op.create_index("ix_materias_instituicao_id_id", "materias", ["instituicao_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_materias_instituicao_id_id", table_name="materias")
+    op.drop_index("ix_instituicoes_usuario_id_id", table_name="instituicoes")
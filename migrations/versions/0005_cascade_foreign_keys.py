@@ -0,0 +1,45 @@
+"""ON DELETE CASCADE em instituicoes.usuario_id e materias.instituicao_id
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# As FKs da 0001 não têm nome; no SQLite o batch as nomeia por esta convenção ao refletir a tabela
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+FOREIGN_KEYS = (
+    ("instituicoes", "usuario_id", "usuarios"),
+    ("materias", "instituicao_id", "instituicoes"),
+)
+
+
+def _replace_foreign_key(table: str, column: str, referred: str, ondelete: str | None) -> None:
+    existing = next(
+        fk for fk in sa.inspect(op.get_bind()).get_foreign_keys(table) if fk["constrained_columns"] == [column]
+    )
+    name = f"fk_{table}_{column}_{referred}"
+    with op.batch_alter_table(table, naming_convention=NAMING_CONVENTION) as batch_op:
+        batch_op.drop_constraint(existing["name"] or name, type_="foreignkey")
+        batch_op.create_foreign_key(name, referred, [column], ["id"], ondelete=ondelete)
+
+
+def upgrade() -> None:
+    for table, column, referred in FOREIGN_KEYS:
+        _replace_foreign_key(table, column, referred, "CASCADE")
+
+
+def downgrade() -> None:
+    for table, column, referred in reversed(FOREIGN_KEYS):
+        _replace_foreign_key(table, column, referred, None)
@@ -0,0 +1,50 @@
+"""Horário semanal das matérias compactado em materias.horario (8 bits por dia)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Ordem de date.weekday(): o dia i ocupa os bits 8*i .. 8*i+7 (mesma codificação de app.core.horario)
+DIAS = ("segunda", "terca", "quarta", "quinta", "sexta", "sabado", "domingo")
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("materias") as batch_op:
+        batch_op.add_column(sa.Column("horario", sa.BigInteger(), nullable=False, server_default="0"))
+
+    # Valores fora de 0..255 não cabem em 8 bits: limitados ao intervalo. CAST antes do
+    # deslocamento: no Postgres, int4 << 32 ou mais dá a volta (conta o deslocamento mod 32)
+    partes = " | ".join(
+        f"(CAST(CASE WHEN aulas_{dia} < 0 THEN 0 WHEN aulas_{dia} > 255 THEN 255 ELSE aulas_{dia} END AS BIGINT) << {8 * i})"
+        for i, dia in enumerate(DIAS)
+    )
+    op.execute(f"UPDATE materias SET horario = {partes}")
+
+    with op.batch_alter_table("materias") as batch_op:
+        for dia in DIAS:
+            batch_op.drop_column(f"aulas_{dia}")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("materias") as batch_op:
+        # Ordem original das colunas: domingo primeiro
+        for dia in DIAS[-1:] + DIAS[:-1]:
+            batch_op.add_column(sa.Column(f"aulas_{dia}", sa.Integer(), nullable=False, server_default="0"))
+
+    valores = ", ".join(f"aulas_{dia} = (horario >> {8 * i}) & 255" for i, dia in enumerate(DIAS))
+    op.execute(f"UPDATE materias SET {valores}")
+
+    with op.batch_alter_table("materias") as batch_op:
+        batch_op.drop_column("horario")
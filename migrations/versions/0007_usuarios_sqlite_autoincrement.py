@@ -0,0 +1,33 @@
+"""AUTOINCREMENT em usuarios.id no SQLite (ids de usuários apagados não voltam)
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 00:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _recreate_usuarios(autoincrement: bool) -> None:
+    # Sem AUTOINCREMENT o SQLite reaproveita o maior rowid depois de um DELETE, e um token do
+    # usuário apagado passaria a valer para o próximo cadastro. No Postgres a sequência já não volta
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    with op.batch_alter_table("usuarios", recreate="always", table_kwargs={"sqlite_autoincrement": autoincrement}):
+        pass
+
+
+def upgrade() -> None:
+    _recreate_usuarios(True)
+
+
+def downgrade() -> None:
+    _recreate_usuarios(False)
@@ -4,5 +4,9 @@
 # Criar diretório para banco se não existir
 mkdir -p /opt/render/project/src
 
+# Aplicar as migrações do banco (o startup só confere a versão)
+alembic upgrade head
+
 # Iniciar a aplicação
-uvicorn app.main:app --host 0.0.0.0 --port $PORT
\ No newline at end of file
+# IP real do cliente a partir do X-Forwarded-For, aceito só dos proxies da rede interna
+uvicorn app.main:app --host 0.0.0.0 --port $PORT --proxy-headers --forwarded-allow-ips "${FORWARDED_ALLOW_IPS:-10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,127.0.0.1}"
\ No newline at end of file